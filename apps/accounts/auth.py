@@ -1,15 +1,18 @@
 from uuid import UUID
+from cachetools import TTLCache
 from django.conf import settings
+from django.utils import timezone
 from google.auth.transport import requests as google_requests
 from google.oauth2 import id_token
 from datetime import datetime, timedelta, UTC
-import jwt, random, string, facebook
+import copy, hashlib, jwt, random, string, threading, uuid, facebook
 
+from apps.common.cache import VersionedCache, cache_is_shared
 from apps.common.exceptions import ErrorCode
 
 from .senders import EmailUtil
 
-from .models import User
+from .models import RefreshToken, User
 
 
 class Google:
@@ -73,6 +76,32 @@ async def register_social_user(
 
 ALGORITHM = "HS256"
 
+# The users of recently used access tokens (with their token cache version), by digest
+token_users = TTLCache(maxsize=10000, ttl=settings.AUTH_CACHE_TTL)
+token_users_lock = threading.Lock()
+
+
+def token_cache(user_id):
+    """
+    The (value-less) versioned namespace of a user's tokens, bumped when the user changes
+    (logout, refresh, deactivation...), so every worker drops its cached copy of the user
+    (within CACHE_VERSION_CHECK_INTERVAL seconds, the version is checked in-process).
+    """
+    return VersionedCache(f"tokens:{user_id}")
+
+
+def copy_user(user):
+    """
+    Copy a user and its selected seller, so a request's changes to either don't leak
+    to the cached ones (shared by the other requests).
+    """
+    user = copy.copy(user)
+    seller = user._state.fields_cache.get("seller")
+    if seller is not None:
+        seller = user._state.fields_cache["seller"] = copy.copy(seller)
+        seller._state.fields_cache["user"] = user
+    return user
+
 
 class Authentication:
     # generate random string
@@ -99,6 +128,61 @@ class Authentication:
             algorithm=ALGORITHM,
         )
 
+    # hash a token, for storing and looking it up
+    def token_digest(token: str):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    # generate new tokens for a user, the access digest is set on the user and
+    # the refresh token's row is built (both to be saved)
+    def new_tokens(user, family: UUID = None):
+        access = Authentication.create_access_token(user.id)
+        refresh = Authentication.create_refresh_token()
+        user.access_digest = Authentication.token_digest(access)
+        refresh_token = RefreshToken(
+            user=user,
+            token_digest=Authentication.token_digest(refresh),
+            family=family or uuid.uuid4(),
+            expires_at=timezone.now()
+            + timedelta(minutes=int(settings.REFRESH_TOKEN_EXPIRE_MINUTES)),
+        )
+        return access, refresh, refresh_token
+
+    # generate and store new tokens for a user, family is kept when rotating
+    def issue_tokens(user, family: UUID = None):
+        access, refresh, refresh_token = Authentication.new_tokens(user, family)
+        user.save()
+        refresh_token.save()
+        return access, refresh
+
+    async def aissue_tokens(user, family: UUID = None):
+        access, refresh, refresh_token = Authentication.new_tokens(user, family)
+        await user.asave()
+        await refresh_token.asave()
+        return access, refresh
+
+    # exchange a refresh token for new tokens, None if it's invalid, expired or reused
+    async def arotate_tokens(token: str):
+        if not Authentication.decode_jwt(token):
+            return None
+        refresh_token = await RefreshToken.objects.select_related("user").aget_or_none(
+            token_digest=Authentication.token_digest(token),
+            expires_at__gt=timezone.now(),
+        )
+        if not refresh_token:
+            return None
+        # Only marked used if it wasn't already, so concurrent refreshes can't both pass
+        rotated = await RefreshToken.objects.filter(
+            id=refresh_token.id, used_at=None
+        ).aupdate(used_at=timezone.now())
+        user = refresh_token.user
+        if not rotated:
+            # A used token came back, so it leaked: revoke its family and the access token
+            await RefreshToken.objects.filter(family=refresh_token.family).adelete()
+            user.access_digest = None
+            await user.asave()
+            return None
+        return await Authentication.aissue_tokens(user, refresh_token.family)
+
     # deocde access token from header
     def decode_jwt(token: str):
         try:
@@ -112,7 +196,22 @@ class Authentication:
         decoded = Authentication.decode_jwt(token)
         if not decoded:
             return None
+        digest = Authentication.token_digest(token)
+        versions = token_cache(decoded["user_id"])
+        # Only cached if the other processes' invalidations are seen (a shared cache)
+        cached_users = cache_is_shared()
+        if cached_users:
+            with token_users_lock:
+                cached = token_users.get(digest)
+            if cached and cached[1] == versions.version():
+                return copy_user(cached[0])
+
+        # The version is read before the user, so a change made meanwhile isn't missed
+        version = versions.version()
         user = User.objects.select_related("seller").get_or_none(
-            id=decoded["user_id"], access=token
+            id=decoded["user_id"], access_digest=digest
         )
+        if user and cached_users:
+            with token_users_lock:
+                token_users[digest] = (copy_user(user), version)
         return user
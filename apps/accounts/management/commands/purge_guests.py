@@ -0,0 +1,77 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from apps.accounts.models import GuestUser
+from apps.shop.models import OrderItem, Wishlist
+import logging, time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Delete the guests (with their wishlists and carts) inactive for a number of days"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Days without a wishlist or cart change after which a guest is deleted",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of guests deleted per transaction",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to pause between batches, to leave room for other writes",
+        )
+
+    def handle(self, **options) -> None:
+        batch_size, pause = options["batch_size"], options["sleep"]
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        # A guest's activity is its latest wishlist or cart change, guests
+        # with ordered items are kept
+        recent_wishlist = Wishlist.objects.filter(
+            guest__isnull=False, updated_at__gte=cutoff
+        )
+        active_orderitems = OrderItem.objects.filter(guest__isnull=False).filter(
+            Q(updated_at__gte=cutoff) | Q(order__isnull=False)
+        )
+        stale = (
+            GuestUser.objects.filter(created_at__lt=cutoff)
+            .exclude(id__in=recent_wishlist.values("guest_id"))
+            .exclude(id__in=active_orderitems.values("guest_id"))
+            .order_by("created_at")
+        )
+        backlog = stale.count()
+        logger.info(f"{backlog} guests inactive since {cutoff:%Y-%m-%d %H:%M}")
+        total = 0
+        started = time.monotonic()
+        while True:
+            # Short transactions, so the locks of a batch are held briefly
+            with transaction.atomic():
+                ids = list(
+                    stale.select_for_update(skip_locked=True).values_list(
+                        "id", flat=True
+                    )[:batch_size]
+                )
+                if not ids:
+                    break
+                # The guests' wishlists and carts are deleted with them
+                GuestUser.objects.filter(id__in=ids).delete()
+            total += len(ids)
+            rate = total / max(time.monotonic() - started, 1e-6)
+            logger.info(
+                f"{total} guests deleted ({rate:.0f}/s), about {max(backlog - total, 0)} left"
+            )
+            if pause:
+                time.sleep(pause)
+        logger.info(f"{total} inactive guests purged")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.accounts.models import RefreshToken
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Delete the expired refresh tokens"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of tokens deleted per query",
+        )
+
+    def handle(self, **options) -> None:
+        batch_size = options["batch_size"]
+        # Used tokens are kept until they expire, to detect their reuse
+        expired = RefreshToken.objects.filter(expires_at__lte=timezone.now())
+        total = 0
+        logger.info("Purging expired refresh tokens")
+        while True:
+            ids = list(expired.values_list("id", flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted, _ = RefreshToken.objects.filter(id__in=ids).delete()
+            total += deleted
+            logger.info(f"{total} refresh tokens deleted")
+        logger.info("Expired refresh tokens purged")
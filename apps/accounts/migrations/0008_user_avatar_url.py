@@ -0,0 +1,34 @@
+# Generated by Django 5.0.7 on 2026-10-17 11:20
+
+import apps.common.models
+from django.db import migrations
+
+
+def backfill_user_avatar_url(apps, schema_editor):
+    User = apps.get_model("accounts", "User")
+    # The URL is resolved by the field when saved
+    for user in User.objects.only("avatar", "social_avatar").iterator(chunk_size=1000):
+        user.save(update_fields=["avatar_url"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0007_user_deleted_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_url",
+            field=apps.common.models.FileURLField(
+                blank=True,
+                editable=False,
+                fallback_field="social_avatar",
+                file_field="avatar",
+                max_length=500,
+                null=True,
+            ),
+        ),
+        migrations.RunPython(backfill_user_avatar_url, migrations.RunPython.noop),
+    ]
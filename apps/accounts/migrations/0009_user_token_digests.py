@@ -0,0 +1,57 @@
+# Generated by Django 5.0.7 on 2026-10-17 14:05
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_user_tokens(apps, schema_editor):
+    User = apps.get_model("accounts", "User")
+    users = User.objects.exclude(access_digest=None, refresh_digest=None)
+    for user in users.only("access_digest", "refresh_digest").iterator(chunk_size=1000):
+        for field in ("access_digest", "refresh_digest"):
+            token = getattr(user, field)
+            if token:
+                setattr(user, field, hashlib.sha256(token.encode()).hexdigest())
+        user.save(update_fields=["access_digest", "refresh_digest"])
+
+
+def clear_user_tokens(apps, schema_editor):
+    # The tokens can't be recovered from their digests, the users log in again
+    User = apps.get_model("accounts", "User")
+    User.objects.update(access_digest=None, refresh_digest=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0008_user_avatar_url"),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name="user",
+            old_name="access",
+            new_name="access_digest",
+        ),
+        migrations.RenameField(
+            model_name="user",
+            old_name="refresh",
+            new_name="refresh_digest",
+        ),
+        migrations.RunPython(hash_user_tokens, clear_user_tokens),
+        migrations.AlterField(
+            model_name="user",
+            name="access_digest",
+            field=models.CharField(
+                db_index=True, editable=False, max_length=64, null=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="user",
+            name="refresh_digest",
+            field=models.CharField(
+                db_index=True, editable=False, max_length=64, null=True
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-17 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0010_refreshtoken_remove_user_refresh_digest"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="guestuser",
+            index=models.Index(fields=["created_at"], name="guestuser_created_at_idx"),
+        ),
+    ]
@@ -1,8 +1,11 @@
+import uuid
+
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
+from django.core import signing
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from apps.common.models import BaseModel, IsDeletedModel
+from apps.common.models import BaseModel, FileURLField, IsDeletedModel
 from .managers import CustomUserManager
 
 ACCOUNT_TYPE_CHOICES = (
@@ -20,6 +23,7 @@ class User(AbstractBaseUser, IsDeletedModel, PermissionsMixin):
         last_name (str): The last name of the user.
         email (str): The email address of the user, used as the username field.
         avatar (ImageField): The avatar image of the user.
+        avatar_url (str): The URL of the avatar, or the social avatar's if there's none (stored on save).
         is_staff (bool): Designates whether the user can log into this admin site.
         is_active (bool): Designates whether this user should be treated as active.
         account_type (str): The type of account (SELLER or BUYER).
@@ -38,14 +42,17 @@ class User(AbstractBaseUser, IsDeletedModel, PermissionsMixin):
     email = models.EmailField(verbose_name=(_("Email address")), unique=True)
     avatar = models.ImageField(upload_to="avatars/", null=True)
     social_avatar = models.URLField(default=settings.DEFAULT_AVATAR_URL)
+    avatar_url = FileURLField(file_field="avatar", fallback_field="social_avatar")
 
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     account_type = models.CharField(
         max_length=6, choices=ACCOUNT_TYPE_CHOICES, default="BUYER"
     )
-    access = models.CharField(max_length=10000, null=True)
-    refresh = models.CharField(max_length=10000, null=True)
+    # sha256 digest of the current access token, the token itself isn't stored
+    access_digest = models.CharField(
+        max_length=64, null=True, db_index=True, editable=False
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["first_name", "last_name"]
@@ -56,6 +63,26 @@ class User(AbstractBaseUser, IsDeletedModel, PermissionsMixin):
         verbose_name = _("User")
         verbose_name_plural = _("Users")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Keep the stored public profile so the catalog cache is only invalidated on its change
+        instance._loaded_profile = instance.public_profile()
+        return instance
+
+    def public_profile(self):
+        """
+        Returns the fields shown with the user's products and reviews (read without
+        loading deferred fields).
+        """
+        avatar = self.__dict__.get("avatar")
+        return (
+            self.__dict__.get("first_name"),
+            self.__dict__.get("last_name"),
+            str(avatar or ""),
+            self.__dict__.get("social_avatar"),
+        )
+
     @property
     def full_name(self):
         """
@@ -75,19 +102,77 @@ class User(AbstractBaseUser, IsDeletedModel, PermissionsMixin):
         """
         return self.full_name
 
-    @property
-    def avatar_url(self):
-        try:
-            url = self.avatar.url
-        except:
-            url = self.social_avatar
-        return url
+
+GUEST_ID_SIGNER = signing.Signer(salt="accounts.guestuser")
 
 
 class GuestUser(BaseModel):
+    """
+    Represents a visitor without an account.
+
+    Guests are identified by signed ids, issued and verified without a query. The
+    guest's row is only created once it owns something (see `amaterialize`).
+    """
+
     @property
     def is_authenticated(self):
         return False
 
+    @property
+    def signed_id(self):
+        return GUEST_ID_SIGNER.sign(str(self.id))
+
+    @classmethod
+    def from_signed_id(cls, signed_id):
+        """
+        Returns the (possibly not yet saved) guest of a signed id, or None if it's invalid.
+        """
+        try:
+            guest_id = uuid.UUID(GUEST_ID_SIGNER.unsign(signed_id))
+        except (signing.BadSignature, ValueError):
+            return None
+        return cls(id=guest_id)
+
+    async def amaterialize(self):
+        """
+        Creates the guest's row if it may not exist yet, before a write references it.
+        """
+        if self._state.adding:
+            # Another request of the same guest may have created it meanwhile
+            await GuestUser.objects.abulk_create([self], ignore_conflicts=True)
+            self._state.adding = False
+
     def __str__(self):
         return str(self.id)
+
+    class Meta:
+        # For finding the inactive guests to purge
+        indexes = [models.Index(fields=["created_at"], name="guestuser_created_at_idx")]
+
+
+class RefreshToken(BaseModel):
+    """
+    Represents an issued refresh token, stored by its sha256 digest.
+
+    Every refresh token is used once: refreshing marks it used and issues the next
+    token of the same family (the tokens descending from one login). A used token
+    presented again means it leaked, and its whole family is revoked.
+
+    Attributes:
+        user (ForeignKey): The user the token was issued to.
+        token_digest (CharField): The sha256 digest of the token.
+        family (UUIDField): The id shared by the tokens descending from one login.
+        expires_at (DateTimeField): When the token expires.
+        used_at (DateTimeField): When the token was exchanged for new tokens, if it was.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="refresh_tokens"
+    )
+    token_digest = models.CharField(max_length=64, unique=True)
+    family = models.UUIDField(default=uuid.uuid4, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+    used_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user} ({self.family})"
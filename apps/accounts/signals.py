@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts.auth import token_cache
+from apps.accounts.models import User
+from apps.sellers.models import Seller
+
+
+@receiver(post_save, sender=User)
+def invalidate_token_cache_on_user_save(sender, instance, **kwargs):
+    # Covers logout, token refresh, deactivation and profile changes
+    token_cache(instance.id).invalidate()
+
+
+@receiver(post_save, sender=Seller)
+@receiver(post_delete, sender=Seller)
+def invalidate_token_cache_on_seller_change(sender, instance, **kwargs):
+    # The users are cached with their seller profile
+    token_cache(instance.user_id).invalidate()
@@ -81,7 +81,5 @@ class TestAccountUtil:
         return seller
 
     def auth_token(user):
-        user.access = Authentication.create_access_token(user.id)
-        user.refresh = Authentication.create_refresh_token()
-        user.save()
-        return user.access
+        access, _ = Authentication.issue_tokens(user)
+        return access
@@ -1,9 +1,18 @@
+from datetime import timedelta
+from django.core.management import call_command
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from apps.accounts.auth import Authentication
+from apps.accounts.models import GuestUser, RefreshToken, User
 from unittest import mock
+from cachetools import TTLCache
+from django.core.cache import cache
 
 from apps.accounts.test_utils import TestAccountUtil
+from apps.common.cache import local_versions
 from apps.common.exceptions import ErrorCode
+from apps.shop.models import OrderItem, Wishlist
+from apps.shop.test_utils import TestShopUtil
 
 
 class TestAccounts(APITestCase):
@@ -105,8 +114,7 @@ class TestAccounts(APITestCase):
 
     def test_refresh_token(self):
         user = self.user
-        user.refresh = Authentication.create_refresh_token()
-        user.save()
+        _, refresh = Authentication.issue_tokens(user)
 
         # Test for invalid refresh token (invalid or expired)
         response = self.client.post(
@@ -124,7 +132,7 @@ class TestAccounts(APITestCase):
 
         # Test for valid refresh token
         mock.patch("apps.accounts.auth.Authentication.decode_jwt", return_value=True)
-        response = self.client.post(self.refresh_url, {"token": user.refresh})
+        response = self.client.post(self.refresh_url, {"token": refresh})
         self.assertEqual(response.status_code, 201)
         self.assertEqual(
             response.json(),
@@ -159,3 +167,108 @@ class TestAccounts(APITestCase):
                 "message": "Access Token is Invalid or Expired!",
             },
         )
+
+    def test_access_token_cache(self):
+        access, _ = Authentication.issue_tokens(self.user)
+        self.assertEqual(self.user.access_digest, Authentication.token_digest(access))
+
+        # Not cached with a per-process cache (other processes' changes wouldn't be seen)
+        bearer = f"Bearer {access}"
+        self.assertEqual(Authentication.decodeAuthorization(bearer), self.user)
+        with self.assertNumQueries(1):
+            Authentication.decodeAuthorization(bearer)
+
+        # The user of a recently used token is reused without a query
+        with mock.patch("apps.accounts.auth.cache_is_shared", return_value=True):
+            self.assertEqual(Authentication.decodeAuthorization(bearer), self.user)
+            with self.assertNumQueries(0):
+                user = Authentication.decodeAuthorization(bearer)
+            self.assertEqual(user, self.user)
+
+            # As copies, the seller included
+            seller = TestShopUtil.product().seller
+            access, _ = Authentication.issue_tokens(seller.user)
+            bearer = f"Bearer {access}"
+            Authentication.decodeAuthorization(bearer)
+            Authentication.decodeAuthorization(bearer).seller.business_name = "Changed"
+            user = Authentication.decodeAuthorization(bearer)
+            self.assertEqual(user.seller.business_name, seller.business_name)
+            self.assertIs(user.seller.user, user)
+
+            # Logging out drops it
+            response = self.client.get(self.logout_url, HTTP_AUTHORIZATION=bearer)
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(Authentication.decodeAuthorization(bearer))
+
+    @mock.patch("apps.accounts.auth.cache_is_shared", return_value=True)
+    def test_access_token_cache_across_workers(self, _):
+        access, _ = Authentication.issue_tokens(self.user)
+        bearer = f"Bearer {access}"
+        Authentication.decodeAuthorization(bearer)
+
+        # Reused without a query, nor a cache read (the version is checked in-process)
+        with self.assertNumQueries(0), mock.patch(
+            "apps.common.cache.cache", wraps=cache
+        ) as shared_cache:
+            self.assertTrue(Authentication.decodeAuthorization(bearer).is_active)
+        shared_cache.get.assert_not_called()
+
+        # Another worker (its own versions and users, the same cache) deactivates the user
+        with mock.patch(
+            "apps.common.cache.local_versions", TTLCache(100, 60)
+        ), mock.patch("apps.accounts.auth.token_users", TTLCache(100, 60)):
+            user = User.objects.get(id=self.user.id)
+            user.is_active = False
+            user.save()
+
+        # Seen once this worker checks the version again, which drops its copy
+        self.assertTrue(Authentication.decodeAuthorization(bearer).is_active)
+        local_versions.clear()
+        self.assertFalse(Authentication.decodeAuthorization(bearer).is_active)
+
+    def test_refresh_token_reuse(self):
+        _, refresh = Authentication.issue_tokens(self.user)
+        response = self.client.post(self.refresh_url, {"token": refresh})
+        self.assertEqual(response.status_code, 201)
+        rotated = response.json()["data"]["refresh"]
+        self.assertEqual(
+            RefreshToken.objects.get(
+                token_digest=Authentication.token_digest(rotated)
+            ).family,
+            RefreshToken.objects.get(
+                token_digest=Authentication.token_digest(refresh)
+            ).family,
+        )
+
+        # Reusing a rotated token revokes its whole family
+        response = self.client.post(self.refresh_url, {"token": refresh})
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(self.refresh_url, {"token": rotated})
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(RefreshToken.objects.filter(user=self.user).exists())
+
+    def test_purge_refresh_tokens(self):
+        Authentication.issue_tokens(self.user)
+        Authentication.issue_tokens(self.user)
+        RefreshToken.objects.filter(id=RefreshToken.objects.values("id")[:1]).update(
+            expires_at=timezone.now()
+        )
+        call_command("purge_refresh_tokens", batch_size=1)
+        self.assertEqual(RefreshToken.objects.filter(user=self.user).count(), 1)
+
+    def test_purge_guests(self):
+        product = TestShopUtil.product()
+        old = timezone.now() - timedelta(days=40)
+        inactive, active, new = GuestUser.objects.bulk_create(
+            [GuestUser(), GuestUser(), GuestUser()]
+        )
+        GuestUser.objects.filter(id__in=[inactive.id, active.id]).update(created_at=old)
+        Wishlist.objects.create(guest=inactive, product=product)
+        Wishlist.objects.filter(guest=inactive).update(updated_at=old)
+        OrderItem.objects.create(guest=active, product=product, quantity=1)
+
+        call_command("purge_guests", days=30, batch_size=1)
+        self.assertCountEqual(
+            GuestUser.objects.values_list("id", flat=True), [active.id, new.id]
+        )
+        self.assertFalse(Wishlist.objects.filter(guest_id=inactive.id).exists())
@@ -2,7 +2,7 @@ from adrf.views import APIView
 from drf_spectacular.utils import extend_schema
 
 from .auth import Authentication, Facebook, Google, register_social_user
-from .models import User
+from .models import RefreshToken
 from .schema_examples import (
     AUTH_LOGOUT_RESPONSE,
     AUTH_REFRESH_RESPONSE,
@@ -56,11 +56,7 @@ class GoogleAuthView(APIView):
             user_data["email"], user_data["name"], user_data["picture"]
         )
 
-        access = Authentication.create_access_token(user.id)
-        refresh = Authentication.create_refresh_token()
-        user.access = access
-        user.refresh = refresh
-        await user.asave()
+        access, refresh = await Authentication.aissue_tokens(user)
         return CustomResponse.success(
             message="Tokens Generation successful",
             data={"access": access, "refresh": refresh},
@@ -107,11 +103,7 @@ class FacebookAuthView(APIView):
 
         user = await register_social_user(user_data["email"], user_data["name"])
 
-        access = Authentication.create_access_token(user.id)
-        refresh = Authentication.create_refresh_token()
-        user.access = access
-        user.refresh = refresh
-        await user.asave()
+        access, refresh = await Authentication.aissue_tokens(user)
         return CustomResponse.success(
             message="Tokens Generation successful",
             data={"access": access, "refresh": refresh},
@@ -128,7 +120,8 @@ class RefreshTokensView(APIView):
 
     Methods:
         post(request):
-            Validates the refresh token and generates new access and refresh tokens if valid.
+            Validates the refresh token and rotates it, generating new access and refresh tokens if valid.
+            A refresh token used twice revokes all the tokens descending from the same login.
     """
 
     serializer_class = TokenSerializer
@@ -145,21 +138,18 @@ class RefreshTokensView(APIView):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         token = serializer.validated_data["token"]
-        user = await User.objects.aget_or_none(refresh=token)
-        if not user or not Authentication.decode_jwt(token):
+        tokens = await Authentication.arotate_tokens(token)
+        if not tokens:
             raise RequestError(
                 err_code=ErrorCode.INVALID_TOKEN,
                 err_msg="Refresh token is invalid or expired",
                 status_code=401,
             )
-
-        user.access = Authentication.create_access_token(user.id)
-        user.refresh = Authentication.create_refresh_token()
-        await user.asave()
+        access, refresh = tokens
 
         return CustomResponse.success(
             message="Tokens refresh successful",
-            data={"access": user.access, "refresh": user.refresh},
+            data={"access": access, "refresh": refresh},
             status_code=201,
         )
 
@@ -170,7 +160,7 @@ class LogoutView(APIView):
 
     Methods:
         get(request):
-            Logs the user out by setting the access and refresh tokens to None.
+            Logs the user out by clearing the access token and deleting the refresh tokens.
     """
 
     permission_classes = (IsAuthenticatedCustom,)
@@ -185,8 +175,9 @@ class LogoutView(APIView):
     )
     async def get(self, request):
         user = request.user
-        user.access = user.refresh = None
+        user.access_digest = None
         await user.asave()
+        await RefreshToken.objects.filter(user=user).adelete()
         return CustomResponse.success(
             message="Logout successful",
         )
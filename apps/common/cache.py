@@ -0,0 +1,181 @@
+import hashlib, json, threading, time
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+
+def cache_is_shared(alias="default"):
+    """
+    Whether the cache is shared by the server's processes, so invalidations made by
+    one of them reach the others (not the case of the per-process local memory cache).
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+# Seconds a process' hit/miss counts are kept before being added to the shared counters
+COUNTS_FLUSH_INTERVAL = 10
+
+# The versions this process read from (or wrote to) the cache, reused without reading
+# it for CACHE_VERSION_CHECK_INTERVAL seconds, by version key
+local_versions = TTLCache(maxsize=100000, ttl=settings.CACHE_VERSION_CHECK_INTERVAL)
+local_versions_lock = threading.Lock()
+
+
+class VersionedCache:
+    """
+    A namespace in the default cache whose entries can all be invalidated at once.
+
+    Every key embeds the namespace's current version, so invalidating is a single
+    `incr` of that version (no key scanning). Stale entries are never read again
+    and simply expire. A process reuses the versions it read for
+    CACHE_VERSION_CHECK_INTERVAL seconds, so most lookups don't read the cache, and
+    the other processes' invalidations are seen within that delay (its own at once). Lookups are counted as hits/misses in the cache itself, so
+    the counters are shared by every worker using the same cache backend. Each process
+    adds its counts in one atomic `incr` per counter every COUNTS_FLUSH_INTERVAL seconds,
+    so lookups don't write to the cache.
+
+    Attributes:
+        namespace (str): Prefix of all the keys of this cache.
+        timeout (int): Seconds an entry lives at most, as a safety net.
+        version_timeout (int): Seconds a version lives at most, None for ever (the
+            namespaces of users or guests expire, most are never used again).
+    """
+
+    def __init__(self, namespace, timeout=300, version_timeout=None):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.version_timeout = version_timeout
+        self.version_key = f"{namespace}:version"
+        # The hit/miss counts of this process not added to the shared counters yet
+        self._counts = {"hits": 0, "misses": 0}
+        self._counts_flushed_at = time.monotonic()
+
+    def new_version(self):
+        # Not 1, so an evicted version key can't bring back older entries
+        return time.time_ns()
+
+    def local_version(self):
+        with local_versions_lock:
+            return local_versions.get(self.version_key)
+
+    def remember_version(self, version):
+        with local_versions_lock:
+            local_versions[self.version_key] = version
+        return version
+
+    async def aversion(self):
+        version = self.local_version()
+        if version is not None:
+            return version
+        version = await cache.aget(self.version_key)
+        if version is None:
+            await cache.aadd(
+                self.version_key, self.new_version(), timeout=self.version_timeout
+            )
+            version = await cache.aget(self.version_key)
+        return self.remember_version(version)
+
+    def version(self):
+        version = self.local_version()
+        if version is not None:
+            return version
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(
+                self.version_key, self.new_version(), timeout=self.version_timeout
+            )
+            version = cache.get(self.version_key)
+        return self.remember_version(version)
+
+    def bump_version(self):
+        try:
+            version = cache.incr(self.version_key)
+        except ValueError:  # No version yet (or evicted)
+            cache.add(
+                self.version_key, self.new_version(), timeout=self.version_timeout
+            )
+            version = cache.get(self.version_key)
+        # This process sees its own changes right away
+        self.remember_version(version)
+
+    def invalidate(self):
+        # Once now, and once on commit, so an entry cached in between from
+        # not yet committed data doesn't outlive the transaction
+        self.bump_version()
+        transaction.on_commit(self.bump_version)
+
+    async def amake_key(self, *parts, params=None):
+        """
+        Build the key of an entry from its parts and a dict of (already normalized) params.
+        """
+        version = await self.aversion()
+        params_hash = hashlib.sha1(
+            json.dumps(params or {}, sort_keys=True).encode()
+        ).hexdigest()
+        return ":".join([self.namespace, str(version), *parts, params_hash])
+
+    async def aget(self, key):
+        value = await cache.aget(key)
+        await self.acount("hits" if value is not None else "misses")
+        return value
+
+    async def aset(self, key, value):
+        await cache.aset(key, value, timeout=self.timeout)
+
+    async def acount(self, counter):
+        # Counted in-process, and added to the shared counters every few seconds
+        self._counts[counter] += 1
+        if time.monotonic() - self._counts_flushed_at >= COUNTS_FLUSH_INTERVAL:
+            await self.aflush_counts()
+
+    async def aflush_counts(self):
+        counts, self._counts = self._counts, {"hits": 0, "misses": 0}
+        self._counts_flushed_at = time.monotonic()
+        for counter, count in counts.items():
+            if not count:
+                continue
+            key = f"{self.namespace}:{counter}"
+            try:
+                await cache.aincr(key, count)
+            except ValueError:
+                if not await cache.aadd(key, count, timeout=None):
+                    await cache.aincr(key, count)
+
+    def stats(self):
+        hits = cache.get(f"{self.namespace}:hits", 0)
+        misses = cache.get(f"{self.namespace}:misses", 0)
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        }
+
+
+def make_etag(*parts):
+    """
+    Build a weak ETag from the versions and other (JSON serializable) parts a response depends on.
+    """
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def not_modified_response(request, etag):
+    """
+    Return a 304 response if the request's If-None-Match matches `etag`, else None.
+    """
+    response = get_conditional_response(request, etag=etag)
+    # With the headers of the full response, for the client to keep revalidating
+    return set_etag(response, etag) if response is not None else None
+
+
+def set_etag(response, etag):
+    # The responses can be personal (wishlisted flags, guest id) and must be revalidated
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
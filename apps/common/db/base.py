@@ -0,0 +1,172 @@
+import logging, threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+from django.utils.asyncio import async_unsafe
+from psycopg import IsolationLevel
+from psycopg_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def destroy_test_db(self, *args, **kwargs):
+        # The pooled connections to the test database would keep it from being dropped
+        self.connection.close()
+        self.connection.close_pool()
+        return super().destroy_test_db(*args, **kwargs)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Django's PostgreSQL backend, taking its connections from a psycopg pool when
+    `OPTIONS["pool"]` is set (True, or the `psycopg_pool.ConnectionPool` arguments,
+    e.g. min_size, max_size, max_idle, max_lifetime and timeout).
+
+    Closing a connection (at the end of a request, CONN_MAX_AGE must be 0) returns it
+    to the pool, so requests (each on its own thread under ASGI) skip the connect.
+    Connections are checked before being handed out with CONN_HEALTH_CHECKS, and the
+    pool closes the ones idle for too long or too old in the background.
+    Without the option, it works like Django's backend.
+    """
+
+    creation_class = DatabaseCreation
+
+    # The pools of the process, by alias and database name (tests switch the name)
+    _connection_pools = {}
+    _connection_pools_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        pool_options = self.settings_dict["OPTIONS"].get("pool")
+        if self.alias == NO_DB_ALIAS or not pool_options:
+            return None
+        key = (self.alias, self.settings_dict["NAME"])
+        pool = self._connection_pools.get(key)
+        if pool is None:
+            with self._connection_pools_lock:
+                pool = self._connection_pools.get(key)
+                if pool is None:
+                    pool = self._connection_pools[key] = self.create_pool(pool_options)
+        return pool
+
+    def create_pool(self, pool_options):
+        if self.settings_dict["CONN_MAX_AGE"] != 0:
+            raise ImproperlyConfigured(
+                "Pooled connections are returned to the pool on close, CONN_MAX_AGE must be 0."
+            )
+        if pool_options is True:
+            pool_options = {}
+        kwargs = self.get_connection_params()
+        # Django sets autocommit itself once it has the connection
+        kwargs["autocommit"] = True
+        return ConnectionPool(
+            kwargs=kwargs,
+            # Opened on the first connection, not at startup
+            open=False,
+            check=(
+                ConnectionPool.check_connection
+                if self.settings_dict["CONN_HEALTH_CHECKS"]
+                else None
+            ),
+            name=f"{self.alias}:{self.settings_dict['NAME']}",
+            **pool_options,
+        )
+
+    def close_pool(self):
+        key = (self.alias, self.settings_dict["NAME"])
+        with self._connection_pools_lock:
+            pool = self._connection_pools.pop(key, None)
+        if pool is not None:
+            pool.close()
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("pool", None)
+        return params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        # Same isolation level handling as Django's
+        isolation_level = self.settings_dict["OPTIONS"].get("isolation_level")
+        try:
+            self.isolation_level = IsolationLevel(
+                isolation_level
+                if isolation_level is not None
+                else IsolationLevel.READ_COMMITTED
+            )
+        except ValueError:
+            raise ImproperlyConfigured(
+                f"Invalid transaction isolation level {isolation_level} "
+                f"specified. Use one of the psycopg.IsolationLevel values."
+            )
+        pool.open()
+        connection = pool.getconn()
+        if isolation_level is not None:
+            connection.isolation_level = self.isolation_level
+        # Returned to this pool even if the settings change meanwhile (e.g. in tests)
+        self._connection_pool = pool
+        return connection
+
+    def _close(self):
+        pool = getattr(self, "_connection_pool", None)
+        if self.connection is None or pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            self._connection_pool = None
+            # The pool rolls back a connection left in a transaction, and drops a broken one
+            pool.putconn(self.connection)
+            # It's another thread's now, even if closed in an atomic block (where
+            # the base close() keeps closed connections)
+            self.connection = None
+
+
+def pool_metrics():
+    """
+    The usage counters of the process' connection pools, by pool name.
+
+    Returns:
+        dict: {name: {"size", "in_use", "idle", "waiting", "requests", "wait_ms", "avg_wait_ms", ...}}
+    """
+    metrics = {}
+    for pool in list(DatabaseWrapper._connection_pools.values()):
+        stats = pool.get_stats()
+        requests = stats.get("requests_num", 0)
+        wait_ms = stats.get("requests_wait_ms", 0)
+        metrics[pool.name] = {
+            "size": stats.get("pool_size", 0),
+            "in_use": stats.get("pool_size", 0) - stats.get("pool_available", 0),
+            "idle": stats.get("pool_available", 0),
+            "waiting": stats.get("requests_waiting", 0),
+            "requests": requests,
+            "wait_ms": wait_ms,
+            "avg_wait_ms": round(wait_ms / requests, 2) if requests else 0,
+            "timeouts": stats.get("requests_errors", 0),
+            "connections": stats.get("connections_num", 0),
+            "connect_ms": stats.get("connections_ms", 0),
+            "lost": stats.get("connections_lost", 0),
+        }
+    return metrics
+
+
+def log_pool_metrics(interval):
+    """
+    Log the pools' metrics every `interval` seconds, from a daemon thread.
+    """
+
+    def run():
+        while not stopped.wait(interval):
+            for name, metrics in pool_metrics().items():
+                logger.info(
+                    f"Connection pool {name}: {metrics['in_use']} in use, {metrics['idle']} idle, "
+                    f"{metrics['waiting']} waiting, {metrics['avg_wait_ms']}ms average wait "
+                    f"({metrics['requests']} requests, {metrics['timeouts']} timeouts)"
+                )
+
+    stopped = threading.Event()
+    threading.Thread(target=run, name="db-pool-metrics", daemon=True).start()
+    return stopped
@@ -1,26 +1,195 @@
+import asyncio, contextlib, functools, sys
+
+from django.db import transaction
 from django.db.transaction import Atomic
-from asgiref.sync import sync_to_async
+from asgiref.sync import AsyncToSync, SyncToAsync, ThreadSensitiveContext, sync_to_async
+
+from apps.common.executors import get_transaction_threads, in_atomic_block
+
+# Tasks of `aon_commit` callbacks and of cancelled blocks' cleanups, referenced until
+# done (the loop only keeps weak ones)
+_background_tasks = set()
+
+
+def _start_background_task(coroutine):
+    task = asyncio.ensure_future(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
 
 
 class AsyncAtomicContextManager(Atomic):
-    def __init__(self, using=None, savepoint=True, durable=False):
+    """
+    An async `transaction.atomic`, as an `async with` block (or the `aatomic` decorator).
+
+    The outermost block is pinned to a thread of the transaction pool (see
+    `apps.common.executors.get_transaction_threads`): every thread sensitive
+    `sync_to_async` call made in the block, the ORM's async methods included, runs on
+    that thread. So the whole transaction runs on that thread's connection, which no
+    other request uses meanwhile. Tasks started in the block share its transaction.
+    Nested blocks run on the same thread, as savepoints (unless `savepoint=False`).
+
+    Under `async_to_sync` (e.g. WSGI or tests), thread sensitive calls always run on
+    the calling sync thread, whose connection is its caller's alone already, so the
+    block isn't pinned. Neither is it with DB_TRANSACTION_THREADS = 0.
+
+    Args:
+        statement_timeout (int, optional): Milliseconds a statement of the block may
+            run at most, reset to the enclosing transaction's value after the block.
+    """
+
+    def __init__(
+        self, using=None, savepoint=True, durable=False, statement_timeout=None
+    ):
         super().__init__(using, savepoint, durable)
+        self.statement_timeout = statement_timeout
+        # The states of the currently open uses of this block, it can be re-entered
+        self._states = []
+
+    def _enter(self, state):
+        connection = transaction.get_connection(self.using)
+        state["nested"] = connection.in_atomic_block
+        super().__enter__()
+        if self.statement_timeout is None:
+            return
+        try:
+            with connection.cursor() as cursor:
+                if state["nested"]:
+                    cursor.execute("SHOW statement_timeout")
+                    state["previous_timeout"] = cursor.fetchone()[0]
+                # SET LOCAL, ended with the transaction
+                cursor.execute(
+                    "SELECT set_config('statement_timeout', %s, true)",
+                    [str(self.statement_timeout)],
+                )
+        except BaseException:
+            # Not left open, __aexit__ won't run
+            super().__exit__(*sys.exc_info())
+            raise
+
+    def _exit(self, state, exc_type, exc_value, traceback):
+        connection = transaction.get_connection(self.using)
+        try:
+            if (
+                "previous_timeout" in state
+                and exc_type is None
+                and not connection.needs_rollback
+            ):
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT set_config('statement_timeout', %s, true)",
+                        [state["previous_timeout"]],
+                    )
+        finally:
+            try:
+                super().__exit__(exc_type, exc_value, traceback)
+            finally:
+                if "executor" in state:
+                    # Like at the end of a request, the pinned connection is kept for
+                    # the next transaction unless it's obsolete or broken
+                    connection.close_if_unusable_or_obsolete()
+
+    async def _apin(self, state):
+        threads = get_transaction_threads()
+        if (
+            threads is None
+            or in_atomic_block.get()
+            or getattr(AsyncToSync.executors, "current", None)
+        ):
+            return
+        state["threads"] = threads
+        state["executor"] = await threads.acquire()
+        state["context"] = ThreadSensitiveContext()
+        SyncToAsync.context_to_thread_executor[state["context"]] = state["executor"]
+        state["context_token"] = SyncToAsync.thread_sensitive_context.set(
+            state["context"]
+        )
+
+    def _unset_context(self, state):
+        if "context_token" in state:
+            SyncToAsync.thread_sensitive_context.reset(state.pop("context_token"))
+
+    def _release(self, state):
+        if "executor" in state:
+            SyncToAsync.context_to_thread_executor.pop(state["context"], None)
+            state["threads"].release(state.pop("executor"))
+
+    def _unpin(self, state):
+        self._unset_context(state)
+        self._release(state)
+
+    async def _aabort(self, enter, state):
+        """
+        Close (roll back) a block whose task was cancelled while it was being opened,
+        before its thread is handed to another transaction.
+        """
+        try:
+            try:
+                await enter
+            except BaseException:
+                return  # It wasn't left open
+            exc = asyncio.CancelledError()
+            await sync_to_async(self._exit)(state, type(exc), exc, None)
+        finally:
+            self._release(state)
 
     async def __aenter__(self):
-        await sync_to_async(super().__enter__)()
+        state = {}
+        await self._apin(state)
+        # Once started, the block is opened on its thread whatever happens to this task
+        enter = asyncio.ensure_future(sync_to_async(self._enter)(state))
+        try:
+            await asyncio.shield(enter)
+        except asyncio.CancelledError:
+            # The cleanup is started in the block's (pinned) context
+            abort = _start_background_task(self._aabort(enter, state))
+            self._unset_context(state)
+            with contextlib.suppress(Exception, asyncio.CancelledError):
+                await asyncio.shield(abort)
+            raise
+        except BaseException:
+            self._unpin(state)
+            raise
+        # Reads of the block are kept off the read executor (see `aread`)
+        state["in_atomic_block_token"] = in_atomic_block.set(True)
+        self._states.append(state)
         return self
 
     async def __aexit__(self, exc_type, exc_value, traceback):
-        await sync_to_async(super().__exit__)(exc_type, exc_value, traceback)
+        state = self._states.pop()
+        in_atomic_block.reset(state["in_atomic_block_token"])
+        try:
+            await sync_to_async(self._exit)(state, exc_type, exc_value, traceback)
+        finally:
+            self._unpin(state)
+
+
+def aatomic(fun=None, **kwargs):
+    """
+    Run a coroutine function in an `AsyncAtomicContextManager` block, as `@aatomic`
+    or with the block's arguments, as `@aatomic(statement_timeout=5000)`.
+    """
+
+    def decorator(fun):
+        @functools.wraps(fun)
+        async def wrapper(*args, **fun_kwargs):
+            async with AsyncAtomicContextManager(**kwargs):
+                return await fun(*args, **fun_kwargs)
+
+        return wrapper
 
+    return decorator(fun) if fun else decorator
 
-def aatomic(fun):
-    async def wrapper(*args, **kwargs):
-        async with AsyncAtomicContextManager():
-            return await fun(*args, **kwargs)
 
-    return wrapper
+async def aon_commit(func, using=None, robust=False):
+    """
+    Register a callback run once the current transaction commits, like `transaction.on_commit`
+    (so right away outside of transactions). Coroutine functions are run on the event loop.
+    """
+    if asyncio.iscoroutinefunction(func):
+        loop, coroutine_func = asyncio.get_running_loop(), func
 
+        def func():
+            loop.call_soon_threadsafe(_start_background_task, coroutine_func())
 
-# async def test():
-#     async with AsyncAtomicContextManager():
+    await sync_to_async(transaction.on_commit)(func, using=using, robust=robust)
@@ -0,0 +1,154 @@
+import asyncio, contextvars, functools, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+# Set while an `aatomic` block is open, so its reads stay on its connection
+in_atomic_block = contextvars.ContextVar("in_atomic_block", default=False)
+
+_read_executor = None
+_read_executor_lock = threading.Lock()
+
+_transaction_threads = None
+_transaction_threads_lock = threading.Lock()
+
+
+def get_read_executor():
+    """
+    The process' pool of DB_READ_EXECUTOR_THREADS threads for read-only queries,
+    or None if it's disabled (0 threads).
+
+    Every thread keeps its own connection(s) between queries, so at most that many
+    extra connections per process are opened. With the connection pool (see
+    `apps.common.db`), the threads take their connections from it for each read instead.
+    """
+    global _read_executor
+    threads = settings.DB_READ_EXECUTOR_THREADS
+    if threads < 1:
+        return None
+    # Rebuilt if the setting changed (e.g. overridden in tests and benchmarks)
+    if _read_executor is None or _read_executor._max_workers != threads:
+        with _read_executor_lock:
+            if _read_executor is None or _read_executor._max_workers != threads:
+                if _read_executor is not None:
+                    _read_executor.shutdown(wait=False)
+                _read_executor = ThreadPoolExecutor(
+                    max_workers=threads, thread_name_prefix="db-read"
+                )
+    return _read_executor
+
+
+def _run_read(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        for connection in connections.all(initialized_only=True):
+            if getattr(connection, "pool", None) is not None:
+                # Given back to the pool, for the requests' threads to use too
+                connection.close()
+            elif connection.errors_occurred:
+                # A connection left broken by an error is dropped, the next query reconnects
+                connection.close_if_unusable_or_obsolete()
+
+
+async def aread(func, *args, **kwargs):
+    """
+    Run a sync function making read-only queries in the read executor, so reads
+    of the same or other requests run in parallel.
+
+    Inside an `aatomic` block (or with the executor disabled), it runs like a
+    thread sensitive `sync_to_async`, on the thread and connection of the transaction.
+    """
+    executor = get_read_executor()
+    if executor is None or in_atomic_block.get():
+        return await sync_to_async(func)(*args, **kwargs)
+    return await sync_to_async(
+        functools.partial(_run_read, func), thread_sensitive=False, executor=executor
+    )(*args, **kwargs)
+
+
+async def alist(queryset):
+    """
+    Evaluate a queryset in the read executor.
+    """
+    return await aread(list, queryset)
+
+
+class TransactionThreads:
+    """
+    A pool of single thread executors, each checked out by one transaction at a time.
+
+    Every thread keeps its own connection between transactions (closed when obsolete,
+    see CONN_MAX_AGE), so a transaction pinned to a thread has that connection to itself.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._semaphore = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        if not self._semaphore.acquire(blocking=False):
+            await self._await_slot()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-transaction")
+
+    async def _await_slot(self):
+        # Waiting for a slot is done in the loop's default executor, so it can't block
+        # the event loop. That wait can't be interrupted: if the awaiting task is
+        # cancelled, the slot it takes (or already took) is given back
+        handoff = threading.Lock()
+        state = {"cancelled": False, "acquired": False}
+
+        def wait():
+            self._semaphore.acquire()
+            with handoff:
+                if state["cancelled"]:
+                    self._semaphore.release()
+                else:
+                    state["acquired"] = True
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, wait)
+        except asyncio.CancelledError:
+            with handoff:
+                state["cancelled"] = True
+                if state["acquired"]:
+                    self._semaphore.release()
+            raise
+
+    def release(self, executor):
+        with self._lock:
+            self._idle.append(executor)
+        self._semaphore.release()
+
+    def shutdown(self):
+        with self._lock:
+            for executor in self._idle:
+                executor.submit(connections.close_all)
+                executor.shutdown()
+            self._idle = []
+
+
+def get_transaction_threads():
+    """
+    The process' pool of DB_TRANSACTION_THREADS transaction threads, or None if
+    it's disabled (0 threads).
+    """
+    global _transaction_threads
+    size = settings.DB_TRANSACTION_THREADS
+    if size < 1:
+        return None
+    # Rebuilt if the setting changed (e.g. overridden in tests and benchmarks)
+    if _transaction_threads is None or _transaction_threads.size != size:
+        with _transaction_threads_lock:
+            if _transaction_threads is None or _transaction_threads.size != size:
+                if _transaction_threads is not None:
+                    _transaction_threads.shutdown()
+                _transaction_threads = TransactionThreads(size)
+    return _transaction_threads
@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from apps.common.db.base import DatabaseWrapper, pool_metrics
+import copy, logging, time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Compare the per request connect time with and without the connection pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Number of requests run"
+        )
+
+    def handle(self, **options) -> None:
+        requests = options["requests"]
+        settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+
+        def request(settings_dict):
+            # A connection like a request's: opened, used for a query and closed
+            connection = DatabaseWrapper(settings_dict, DEFAULT_DB_ALIAS)
+            started = time.perf_counter()
+            connection.ensure_connection()
+            connected = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.close()
+            return connected - started, time.perf_counter() - started
+
+        def run(settings_dict):
+            # Like under ASGI, every request on its own thread
+            timings = []
+            for _ in range(requests):
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    timings.append(executor.submit(request, settings_dict).result())
+            connect = sum(timing[0] for timing in timings) / requests * 1000
+            total = sum(timing[1] for timing in timings) / requests * 1000
+            return connect, total
+
+        unpooled = copy.deepcopy(settings_dict)
+        unpooled["OPTIONS"]["pool"] = False
+        pooled = copy.deepcopy(settings_dict)
+        pooled["OPTIONS"]["pool"] = pooled["OPTIONS"].get("pool") or True
+
+        connect, total = run(unpooled)
+        logger.info(f"Without pool: {connect:.2f}ms connect, {total:.2f}ms per request")
+        pooled_connect, pooled_total = run(pooled)
+        logger.info(
+            f"With pool: {pooled_connect:.2f}ms connect, {pooled_total:.2f}ms per request"
+        )
+        logger.info(
+            f"Saved per request: {connect - pooled_connect:.2f}ms ({pool_metrics()})"
+        )
+        DatabaseWrapper(pooled, DEFAULT_DB_ALIAS).close_pool()
@@ -0,0 +1,61 @@
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import override_settings
+from apps.common.executors import aread
+import asyncio, logging, time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Compare the throughput of concurrent reads with sync_to_async and the read executor"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--queries", type=int, default=200, help="Number of queries run"
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=32, help="Number of concurrent tasks"
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.005,
+            help="Seconds every query takes in the database (pg_sleep)",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            nargs="+",
+            default=[1, 2, 4, 8, 16],
+            help="Read executor sizes measured",
+        )
+
+    def handle(self, **options) -> None:
+        queries, concurrency = options["queries"], options["concurrency"]
+        latency = options["latency"]
+
+        def read():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_sleep(%s)", [latency])
+
+        async def run(run_read):
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def task():
+                async with semaphore:
+                    await run_read(read)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(task() for _ in range(queries)))
+            return queries / (time.perf_counter() - started)
+
+        rate = asyncio.run(run(lambda func: sync_to_async(func)()))
+        logger.info(f"sync_to_async (thread sensitive): {rate:.0f} queries/s")
+        for threads in options["threads"]:
+            with override_settings(DB_READ_EXECUTOR_THREADS=threads):
+                rate = asyncio.run(run(aread))
+            logger.info(f"Read executor, {threads} threads: {rate:.0f} queries/s")
+        connections.close_all()
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from apps.common.renderers import GuestIDRenderer, ORJSONGuestIDRenderer
+from apps.shop.schema_examples import PRODUCT_EXAMPLE
+import logging, timeit
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Compare the render time of the stdlib json and orjson renderers on a product page"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--items", type=int, default=100, help="Number of products on the page"
+        )
+        parser.add_argument(
+            "--iterations", type=int, default=1000, help="Number of renders timed"
+        )
+
+    def handle(self, **options) -> None:
+        items, iterations = options["items"], options["iterations"]
+        data = {
+            "status": "success",
+            "message": "Products Fetched Successfully",
+            "data": {
+                "per_page": items,
+                "current_page": 1,
+                "last_page": 1,
+                "products": [PRODUCT_EXAMPLE | {"wishlisted": False}] * items,
+            },
+        }
+        renderers = (GuestIDRenderer(), ORJSONGuestIDRenderer())
+        if len({renderer.render(data) for renderer in renderers}) != 1:
+            logger.warning("The renderers outputs differ")
+
+        timings = {}
+        for renderer in renderers:
+            name = type(renderer).__name__
+            # Best of a few runs, to leave out the noise of other processes
+            seconds = min(
+                timeit.repeat(
+                    lambda: renderer.render(data), number=iterations, repeat=5
+                )
+            )
+            timings[name] = seconds / iterations * 1e6
+            logger.info(f"{name}: {timings[name]:.1f}µs per render of {items} products")
+        speedup = timings["GuestIDRenderer"] / timings["ORJSONGuestIDRenderer"]
+        logger.info(f"ORJSONGuestIDRenderer is {speedup:.1f}x faster")
@@ -0,0 +1,88 @@
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    close_old_connections,
+    connection,
+    connections,
+)
+from django.test.utils import override_settings
+from apps.common.decorators import AsyncAtomicContextManager
+from apps.common.executors import get_transaction_threads
+import asyncio, logging, time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Compare the throughput of concurrent async transactions on the request's thread and pinned to the transaction threads"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--transactions",
+            type=int,
+            default=500,
+            help="Number of transactions run",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=32, help="Number of concurrent requests"
+        )
+        parser.add_argument(
+            "--statements",
+            type=int,
+            default=3,
+            help="Number of statements per transaction",
+        )
+        parser.add_argument(
+            "--conn-max-age",
+            type=int,
+            default=None,
+            help="CONN_MAX_AGE of the pinned threads, which keep persistent connections",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            nargs="+",
+            default=[4, 8, 16],
+            help="Transaction thread pool sizes measured",
+        )
+
+    def handle(self, **options) -> None:
+        transactions, concurrency = options["transactions"], options["concurrency"]
+        statements = options["statements"]
+
+        def statement():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def request():
+                # Like Django's ASGI handler, every request has its own thread, whose
+                # connections are closed when it ends (unless persistent)
+                async with semaphore, ThreadSensitiveContext():
+                    async with AsyncAtomicContextManager():
+                        for _ in range(statements):
+                            await sync_to_async(statement)()
+                    await sync_to_async(close_old_connections)()
+
+            started = time.perf_counter()
+            await asyncio.gather(*(request() for _ in range(transactions)))
+            return transactions / (time.perf_counter() - started)
+
+        with override_settings(DB_TRANSACTION_THREADS=0):
+            rate = asyncio.run(run())
+        logger.info(f"Request's thread: {rate:.0f} transactions/s")
+        if options["conn_max_age"] is not None:
+            # Only for the pinned threads, the requests' threads would leak theirs
+            connections.settings[DEFAULT_DB_ALIAS]["CONN_MAX_AGE"] = options[
+                "conn_max_age"
+            ]
+        for threads in options["threads"]:
+            with override_settings(DB_TRANSACTION_THREADS=threads):
+                rate = asyncio.run(run())
+                get_transaction_threads().shutdown()
+            logger.info(f"Pinned, {threads} threads: {rate:.0f} transactions/s")
+        connections.close_all()
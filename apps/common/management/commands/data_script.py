@@ -26,6 +26,11 @@ from apps.shop.models import (
     Size,
     Color,
 )
+from apps.shop.utils import (
+    rebuild_product_ratings,
+    update_product_related_ids,
+    update_product_search_vectors,
+)
 from cloudinary_storage.storage import MediaCloudinaryStorage
 import os, random
 
@@ -162,6 +167,8 @@ class CreateData(object):
                     )
                     products_to_create.append(product)
             products = Product.objects.bulk_create(products_to_create)
+            # bulk_create skips the signals that maintain the search vectors
+            update_product_search_vectors(Product.objects.all())
 
             # Product update sizes and colors
             for product in products:
@@ -189,3 +196,7 @@ class CreateData(object):
                 )
                 reviews_to_create.extend([rev1, rev2])
             Review.objects.bulk_create(reviews_to_create)
+            # bulk_create skips the signals that maintain the product ratings
+            rebuild_product_ratings(Product.objects.all())
+            # Ranked by rating, so after it
+            update_product_related_ids(Product.objects.all())
@@ -26,20 +26,44 @@ class BaseModel(models.Model):
     class Meta:
         abstract = True
 
-    @property
-    def image_url(self):
-        """
-        Retrieve the URL of the image associated with the model instance.
-
-        Returns:
-            str: URL of the image or None if the image is not available.
-        """
-        url = None
-        if hasattr(self, "image"):
-            try:
-                url = self.image.url
-            except:
-                url = None
+
+class FileURLField(models.URLField):
+    """
+    Stores the URL of one of the model's file fields, resolved by the storage when the
+    model is saved, so reads never go through the storage backend.
+
+    It must be declared after its file field, whose file is only uploaded (and its
+    final name known) when that field is prepared for saving.
+
+    Attributes:
+        file_field (str): The name of the file field.
+        fallback_field (str, optional): The field whose value is used when there's no file.
+    """
+
+    def __init__(self, *args, file_field=None, fallback_field=None, **kwargs):
+        self.file_field = file_field
+        self.fallback_field = fallback_field
+        kwargs.setdefault("max_length", 500)
+        kwargs.setdefault("null", True)
+        kwargs.setdefault("blank", True)
+        kwargs["editable"] = False
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["file_field"] = self.file_field
+        if self.fallback_field:
+            kwargs["fallback_field"] = self.fallback_field
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        try:
+            url = getattr(model_instance, self.file_field).url
+        except Exception:  # No file, or the storage can't build its URL
+            url = None
+            if self.fallback_field:
+                url = getattr(model_instance, self.fallback_field)
+        setattr(model_instance, self.attname, url)
         return url
 
 
@@ -1,6 +1,23 @@
+import base64, json
+
+from django.core.exceptions import ValidationError
 from django.core.paginator import InvalidPage
+from django.db.models import F, Field, Func, Q, Value
+from django.db.models.lookups import GreaterThan, LessThan
 from rest_framework.pagination import PageNumberPagination
 from apps.common.exceptions import ErrorCode, RequestError
+from apps.common.executors import alist, aread
+
+
+class RowValue(Func):
+    """
+    A row value, `(a, b, ...)`, compared element by element by Postgres.
+    """
+
+    template = "(%(expressions)s)"
+
+    def __init__(self, *expressions):
+        super().__init__(*expressions, output_field=Field())
 
 
 class CustomPagination(PageNumberPagination):
@@ -14,10 +31,81 @@ class CustomPagination(PageNumberPagination):
     page_size_query_param = (
         "page_size"  # Optional: allow clients to override the page size
     )
+    cursor_query_param = "cursor"
+    cursor_ordering = ("-created_at", "-id")
 
-    def paginate_queryset(self, queryset, request):
+    def get_page_params(self, request):
         per_page = request.GET.get("per_page", 100)
         current_page = request.GET.get("current_page", 1)
+        return per_page, current_page
+
+    def invalid_page_error(self, err_msg="Invalid Page"):
+        return RequestError(
+            err_code=ErrorCode.INVALID_PAGE, err_msg=err_msg, status_code=404
+        )
+
+    def encode_cursor(self, obj, ordering):
+        names = [field.lstrip("-") for field in ordering]
+        # Model instances, or `.values()` rows
+        if isinstance(obj, dict):
+            values = [obj[name] for name in names]
+        else:
+            values = [getattr(obj, name) for name in names]
+        data = json.dumps(values, default=str, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, cursor, ordering):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            raise self.invalid_page_error("Invalid Cursor")
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise self.invalid_page_error("Invalid Cursor")
+        return values
+
+    def keyset_filter(self, queryset, ordering, values):
+        """
+        Build the filter matching rows strictly after `values` in `ordering`.
+
+        When the fields are all sorted the same way, for an ordering (a, b, c) this is the
+        row comparison (a, b, c) > (x, y, z), `<` if descending, which Postgres serves
+        straight from an index on those fields. Otherwise it's:
+        a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z),
+        with `>` flipped to `<` for descending fields.
+
+        The values are converted to their field's type (ValidationError if they can't be).
+        """
+        names = [field.lstrip("-") for field in ordering]
+        output_fields = [
+            queryset.query.resolve_ref(name).output_field for name in names
+        ]
+        values = [
+            output_field.to_python(value)
+            for output_field, value in zip(output_fields, values)
+        ]
+        descending = {field.startswith("-") for field in ordering}
+        if len(descending) == 1:
+            lookup = LessThan if descending.pop() else GreaterThan
+            return lookup(
+                RowValue(*(F(name) for name in names)),
+                RowValue(
+                    *(
+                        Value(value, output_field=output_field)
+                        for output_field, value in zip(output_fields, values)
+                    )
+                ),
+            )
+
+        keyset_filter = Q()
+        equal_filter = Q()
+        for field, name, value in zip(ordering, names, values):
+            lookup = "lt" if field.startswith("-") else "gt"
+            keyset_filter |= equal_filter & Q(**{f"{name}__{lookup}": value})
+            equal_filter &= Q(**{name: value})
+        return keyset_filter
+
+    def paginate_queryset(self, queryset, request):
+        per_page, current_page = self.get_page_params(request)
 
         """
         Paginate a queryset if required, either returning a page object,
@@ -37,9 +125,7 @@ class CustomPagination(PageNumberPagination):
         try:
             self.page = paginator.page(current_page)
         except InvalidPage:
-            raise RequestError(
-                err_code=ErrorCode.INVALID_PAGE, err_msg="Invalid Page", status_code=404
-            )
+            raise self.invalid_page_error()
 
         self.request = request
         return {
@@ -48,3 +134,111 @@ class CustomPagination(PageNumberPagination):
             "current_page": current_page,
             "last_page": paginator.num_pages,
         }
+
+    async def apaginate_queryset(
+        self, queryset, request, count_queryset=None, count=None, ordering=None
+    ):
+        """
+        Asynchronously paginate a lazy queryset inside the database.
+
+        Unlike `paginate_queryset`, the queryset is never materialized as a whole.
+        Only a COUNT query and a LIMIT/OFFSET query for the requested page are executed.
+        If the `cursor` query param is present (even empty, for the first page),
+        it switches to cursor mode (see `acursor_paginate_queryset`).
+
+        Args:
+            queryset (QuerySet): The (unevaluated) queryset to paginate.
+            request (HttpRequest): The current request object.
+            count_queryset (QuerySet, optional): A cheaper queryset matching the same rows,
+                used for the total count. Defaults to `queryset`.
+            count (int, optional): An already known total, which skips the COUNT query.
+            ordering (tuple, optional): The keyset ordering used in cursor mode.
+                Defaults to `cursor_ordering`.
+
+        Returns:
+            dict: A dictionary containing pagination details and the items on the current page.
+        """
+        if self.cursor_query_param in request.GET:
+            return await self.acursor_paginate_queryset(queryset, request, ordering)
+        if count is None:
+            if count_queryset is None:
+                count_queryset = queryset
+            count = await aread(count_queryset.count)
+        page, bottom, top = self.get_page_bounds(request, count)
+        items = await alist(queryset[bottom:top])
+
+        self.request = request
+        return {"items": items, **page}
+
+    def get_page_bounds(self, request, count):
+        """
+        Validate the requested page against a known total.
+
+        Returns:
+            tuple: The page details (per_page, current_page, last_page), and the
+            bottom and top offsets of its rows.
+        """
+        per_page, current_page = self.get_page_params(request)
+        paginator = self.django_paginator_class((), per_page)
+        # Prime the paginator's cached count so it never queries
+        paginator.count = count
+        try:
+            current_page = paginator.validate_number(current_page)
+        except InvalidPage:
+            raise self.invalid_page_error()
+
+        bottom = (current_page - 1) * paginator.per_page
+        top = bottom + paginator.per_page
+        page = {
+            "per_page": paginator.per_page,
+            "current_page": current_page,
+            "last_page": paginator.num_pages,
+        }
+        return page, bottom, top
+
+    async def acursor_paginate_queryset(self, queryset, request, ordering=None):
+        """
+        Asynchronously paginate a lazy queryset with an opaque keyset cursor.
+
+        The queryset is ordered by `ordering` (which must end with a unique field),
+        and each page is fetched with a `WHERE (ordering) after (cursor)` filter.
+        So the cost of a page does not grow with its depth, and no COUNT query is run.
+
+        Args:
+            queryset (QuerySet): The (unevaluated) queryset to paginate.
+            request (HttpRequest): The current request object.
+            ordering (tuple, optional): The keyset ordering. Defaults to `cursor_ordering`.
+
+        Returns:
+            dict: A dictionary containing the items on the current page and the cursor for the next one,
+            which is `None` on the last page.
+        """
+        ordering = ordering or self.cursor_ordering
+        per_page, _ = self.get_page_params(request)
+        try:
+            per_page = int(per_page)
+        except (TypeError, ValueError):
+            raise self.invalid_page_error()
+        if per_page < 1:
+            raise self.invalid_page_error()
+
+        queryset = queryset.order_by(*ordering)
+        cursor = request.GET.get(self.cursor_query_param)
+        if cursor:
+            values = self.decode_cursor(cursor, ordering)
+            try:
+                queryset = queryset.filter(
+                    self.keyset_filter(queryset, ordering, values)
+                )
+            except (ValidationError, ValueError, TypeError):
+                raise self.invalid_page_error("Invalid Cursor")
+
+        # Fetch one extra row to know if there's a next page
+        items = await alist(queryset[: per_page + 1])
+        next_cursor = None
+        if len(items) > per_page:
+            items = items[:per_page]
+            next_cursor = self.encode_cursor(items[-1], ordering)
+
+        self.request = request
+        return {"items": items, "per_page": per_page, "next_cursor": next_cursor}
@@ -1,3 +1,5 @@
+import uuid
+
 from rest_framework.permissions import BasePermission
 from apps.accounts.auth import Authentication
 from apps.accounts.models import GuestUser
@@ -21,6 +23,19 @@ def get_user(bearer):
     return user
 
 
+def get_guest(guest_id):
+    # Signed ids are trusted without a query, the guest's row may not exist yet
+    guest = GuestUser.from_signed_id(guest_id) if guest_id else None
+    if not guest and guest_id:
+        # Plain ids were issued before the ids were signed, they're kept if still known
+        try:
+            guest = GuestUser.objects.get_or_none(id=uuid.UUID(guest_id))
+        except ValueError:
+            pass
+    # New guests get an id, and only a row once they own something
+    return guest or GuestUser()
+
+
 def get_auth(request):
     http_auth = request.META.get("HTTP_AUTHORIZATION")
     if not http_auth:
@@ -48,10 +63,7 @@ class IsAuthenticatedOrGuestCustom(BasePermission):
             user = get_user(http_auth)
             request.user = user
         else:
-            guest = GuestUser.objects.get_or_none(id=guest_id)
-            if not guest:
-                guest = GuestUser.objects.create()
-            request.user = guest
+            request.user = get_guest(guest_id)
         return True
 
 
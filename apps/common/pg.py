@@ -0,0 +1,96 @@
+import asyncio, weakref
+
+from django.conf import settings
+from django.db import connections
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+# The pool of the running event loop (pools can't be shared between loops), and the
+# connections it opened
+_pool = None
+_pool_loop = None
+_pool_connections = None
+# Serializes the pool's creation, by loop (asyncio locks are bound to a loop)
+_pool_locks = weakref.WeakKeyDictionary()
+
+
+def async_reads_enabled():
+    return settings.DB_ASYNC_READS
+
+
+def connection_kwargs(alias="default"):
+    """
+    The psycopg connection parameters of a database, as Django connects to it.
+    """
+    params = connections[alias].get_connection_params()
+    # Django's cursor class is sync only
+    params.pop("cursor_factory", None)
+    params["autocommit"] = True
+    return params
+
+
+async def aget_pool():
+    """
+    Return the async connection pool of the running event loop, opening it on first use.
+
+    The pool of another loop is closed: by that loop if it's still running, else (its
+    tasks are gone with it) by closing the connections it opened.
+    """
+    global _pool, _pool_loop, _pool_connections
+    loop = asyncio.get_running_loop()
+    if _pool is not None and _pool_loop is loop:
+        return _pool
+    lock = _pool_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        # Another task may have opened it meanwhile
+        if _pool is None or _pool_loop is not loop:
+            pool_connections = weakref.WeakSet()
+
+            async def configure(connection):
+                pool_connections.add(connection)
+
+            pool = AsyncConnectionPool(
+                kwargs=connection_kwargs(),
+                min_size=1,
+                max_size=settings.DB_ASYNC_POOL_SIZE,
+                configure=configure,
+                open=False,
+            )
+            await pool.open()
+            if _pool is not None:
+                _close_replaced_pool(_pool, _pool_loop, _pool_connections)
+            _pool, _pool_loop, _pool_connections = pool, loop, pool_connections
+    return _pool
+
+
+def _close_replaced_pool(pool, loop, pool_connections):
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(pool.close(), loop)
+        return
+    for connection in list(pool_connections):
+        connection.pgconn.finish()
+
+
+async def aclose_pool():
+    global _pool, _pool_loop, _pool_connections
+    if _pool is not None:
+        await _pool.close()
+        _pool = _pool_loop = _pool_connections = None
+
+
+async def afetchall(sql, params=()):
+    """
+    Run a read-only query on a pooled connection and return its rows as dicts.
+
+    The statement is prepared on the connection, so its next runs skip the planning.
+    """
+    pool = await aget_pool()
+    async with pool.connection() as connection:
+        cursor = connection.cursor(row_factory=dict_row)
+        await cursor.execute(sql, params, prepare=True)
+        return await cursor.fetchall()
+
+
+async def afetchone(sql, params=()):
+    rows = await afetchall(sql, params)
+    return rows[0] if rows else None
@@ -0,0 +1,128 @@
+import copy, logging, threading, time
+
+from django.db import DatabaseError
+
+from apps.common.cache import VersionedCache
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceRegistry:
+    """
+    An in-process copy of a small, rarely changing table, indexed by a few of its fields.
+
+    The rows are loaded once per worker and looked up in dicts, so lookups cost no
+    query. The copy is tagged with the version of a namespace in the shared cache;
+    saving or deleting a row bumps that version (see `invalidate`), and every worker
+    reloads on its next lookup. The version must be in a cache shared by the workers
+    (see CACHES), the settings refuse a per-process one with several workers.
+    `timeout` bounds how long a copy is used anyway, in case a change didn't go
+    through the model (e.g. a raw UPDATE or loaddata), and a lookup missing a row
+    reloads a copy older than `miss_reload_interval` (e.g. a row just created by
+    another process whose invalidation isn't seen yet).
+
+    Attributes:
+        model (Model): The model of the table.
+        keys (tuple): Names of the (unique) fields rows are looked up by.
+        timeout (int): Seconds a loaded copy is used at most.
+        miss_reload_interval (float): Seconds a copy is used before a lookup missing
+            a row reloads it, so misses (e.g. invalid values) reload it that often at most.
+    """
+
+    def __init__(self, model, keys, timeout=3600, miss_reload_interval=1):
+        self.model = model
+        self.keys = tuple(keys)
+        self.timeout = timeout
+        self.miss_reload_interval = miss_reload_interval
+        self.version_cache = VersionedCache(f"registry:{model._meta.label_lower}")
+        self._lock = threading.Lock()
+        # (version, loaded_at, rows, {key: {value: row}}), swapped as a whole
+        self._snapshot = None
+
+    def _build_snapshot(self, version, rows):
+        index = {key: {getattr(row, key): row for row in rows} for key in self.keys}
+        return (version, time.monotonic(), rows, index)
+
+    def _is_fresh(self, snapshot, version):
+        return (
+            snapshot is not None
+            and snapshot[0] == version
+            and time.monotonic() - snapshot[1] < self.timeout
+        )
+
+    def load(self):
+        # The version is read before the rows, so a change made during the load
+        # makes the next lookup reload
+        version = self.version_cache.version()
+        rows = list(self.model.objects.all())
+        with self._lock:
+            self._snapshot = self._build_snapshot(version, rows)
+        return self._snapshot
+
+    async def aload(self):
+        version = await self.version_cache.aversion()
+        rows = [row async for row in self.model.objects.all()]
+        with self._lock:
+            self._snapshot = self._build_snapshot(version, rows)
+        return self._snapshot
+
+    def warm(self):
+        """
+        Load the rows ahead of the first request. Failures (e.g. the table isn't
+        migrated yet) are logged and left to the first lookup.
+        """
+        try:
+            self.load()
+        except DatabaseError as e:
+            logger.warning(f"Couldn't warm the {self.model.__name__} registry: {e}")
+
+    async def asnapshot(self):
+        snapshot = self._snapshot
+        if not self._is_fresh(snapshot, await self.version_cache.aversion()):
+            snapshot = await self.aload()
+        return snapshot
+
+    async def asnapshot_for(self, key, values, reload=False):
+        """
+        The snapshot, reloaded if one of `values` is missing from its `key` index and
+        it's older than `miss_reload_interval` (or whatever its age with `reload`).
+        """
+        snapshot = await self.asnapshot()
+        if any(value not in snapshot[3][key] for value in values) and (
+            reload or time.monotonic() - snapshot[1] >= self.miss_reload_interval
+        ):
+            snapshot = await self.aload()
+        return snapshot
+
+    def invalidate(self):
+        self.version_cache.invalidate()
+
+    async def aget(self, key, value, reload=False):
+        """
+        Return a copy of the row whose `key` field equals `value`, or None.
+
+        With `reload`, a miss always reloads the rows once, for values known to exist
+        (e.g. checked against another table).
+        """
+        snapshot = await self.asnapshot_for(key, [value], reload)
+        row = snapshot[3][key].get(value)
+        # Copies, so a caller mutating its row doesn't change the other requests' ones
+        return copy.copy(row) if row is not None else None
+
+    async def afilter(self, key, values):
+        """
+        Return copies of the rows whose `key` field is in `values`, in the table's order.
+        """
+        snapshot = await self.asnapshot_for(key, values)
+        index = snapshot[3][key]
+        found = {index[value].pk for value in values if value in index}
+        return [copy.copy(row) for row in snapshot[2] if row.pk in found]
+
+    async def aall(self):
+        snapshot = await self.asnapshot()
+        return [copy.copy(row) for row in snapshot[2]]
+
+
+def warm_registries(*registries):
+    for registry in registries:
+        registry.warm()
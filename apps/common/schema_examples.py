@@ -21,6 +21,9 @@ PAGINATED_RESPONSE_EXAMPLE = {"per_page": 100, "current_page": 1, "last_page": 1
 
 UUID_EXAMPLE = "7d26157c-b7ed-4b4f-83de-f7e40e1caca0"
 
+# A guest's id, signed by the server
+GUEST_ID_EXAMPLE = f"{UUID_EXAMPLE}:kSTxJ1tqW8vI_xDZk1OqGvFQhYw4yKAt6XkQ5a6Lb8s"
+
 DATETIME_EXAMPLE = "2024-08-11T09:00:00"
 
 
@@ -38,6 +41,12 @@ def page_parameter_example(item, page_amount_default):
             required=False,
             type=int,
         ),
+        OpenApiParameter(
+            name="cursor",
+            description=f"Switch to cursor pagination (newest {item} first). Pass it empty for the first page, then the returned next_cursor. current_page is ignored and no last_page is returned",
+            required=False,
+            type=str,
+        ),
     ]
 
 
@@ -1,4 +1,11 @@
+import functools
+from collections.abc import Mapping
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Model
+from django.db.models.manager import BaseManager
 from rest_framework import serializers
+from rest_framework.fields import SkipField, empty, is_simple_callable
 
 
 class SuccessResponseSerializer(serializers.Serializer):
@@ -16,5 +23,144 @@ class ErrorDataResponseSerializer(ErrorResponseSerializer):
 
 class PaginatedResponseDataSerializer(serializers.Serializer):
     per_page = serializers.IntegerField()
-    current_page = serializers.IntegerField()
-    last_page = serializers.IntegerField()
+    # Page number mode
+    current_page = serializers.IntegerField(required=False)
+    last_page = serializers.IntegerField(required=False)
+    # Cursor mode
+    next_cursor = serializers.CharField(required=False)
+
+
+# Fields whose to_representation is a plain type conversion
+FAST_REPRESENTATIONS = {
+    serializers.CharField: str,
+    serializers.SlugField: str,
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+}
+
+
+def resolve_attribute(instance, attrs):
+    """
+    DRF's `get_attribute`, with the cheap checks first: dicts before other mappings
+    (an abstract class check) and callables before the simple callable inspection.
+    """
+    for attr in attrs:
+        try:
+            if isinstance(instance, dict):
+                instance = instance[attr]
+            elif isinstance(instance, Model) or not isinstance(instance, Mapping):
+                instance = getattr(instance, attr)
+            else:
+                instance = instance[attr]
+        except ObjectDoesNotExist:
+            return None
+        if callable(instance) and is_simple_callable(instance):
+            try:
+                instance = instance()
+            except (AttributeError, KeyError) as exc:
+                # Not to be taken for a missing attribute, like in DRF
+                raise ValueError(
+                    f'Exception raised in callable attribute "{attr}"; original exception was: {exc}'
+                )
+    return instance
+
+
+class CompiledSerializer:
+    """
+    A read-only fast path of a serializer's output.
+
+    The fields of the serializer are resolved once, into a flat list of
+    (name, getter, converter) steps, so rendering skips DRF's per-field
+    machinery while giving the same output (plain dicts instead of ReturnDicts).
+    Nested serializers are compiled too, except those with a custom
+    `to_representation`, which are called as is. Works with model instances
+    and `.values()` rows (or any mapping) alike.
+
+    SerializerMethodFields are called on a context-less serializer instance,
+    so they must not depend on `self.context`.
+    """
+
+    def __init__(self, serializer_class):
+        if (
+            serializer_class.to_representation
+            is not serializers.Serializer.to_representation
+        ):
+            raise TypeError(
+                f"{serializer_class.__name__} has a custom to_representation and can't be compiled"
+            )
+        self.serializer_class = serializer_class
+        self.steps = [
+            (
+                field.field_name,
+                self.compile_getter(field),
+                self.compile_converter(field),
+            )
+            for field in serializer_class()._readable_fields
+        ]
+
+    @staticmethod
+    def compile_getter(field):
+        # Same as Field.get_attribute, minus the error message formatting
+        source_attrs, default = field.source_attrs, field.default
+
+        def getter(instance):
+            try:
+                return resolve_attribute(instance, source_attrs)
+            except (KeyError, AttributeError):
+                if default is not empty:
+                    return field.get_default()
+                if field.allow_null:
+                    return None
+                if not field.required:
+                    raise SkipField()
+                raise
+
+        return getter
+
+    @staticmethod
+    def compile_converter(field):
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+            if (
+                type(child).to_representation
+                is serializers.Serializer.to_representation
+            ):
+                child = compile_serializer(type(child))
+            else:
+                child = child.to_representation
+
+            def convert_list(data):
+                if isinstance(data, BaseManager):
+                    data = data.all()
+                return [child(item) for item in data]
+
+            return convert_list
+        if (
+            isinstance(field, serializers.Serializer)
+            and type(field).to_representation
+            is serializers.Serializer.to_representation
+        ):
+            return compile_serializer(type(field))
+        return FAST_REPRESENTATIONS.get(type(field), field.to_representation)
+
+    def __call__(self, instance):
+        data = {}
+        for name, getter, converter in self.steps:
+            try:
+                value = getter(instance)
+            except SkipField:
+                continue
+            data[name] = None if value is None else converter(value)
+        return data
+
+    def many(self, instances):
+        return [self(instance) for instance in instances]
+
+
+@functools.cache
+def compile_serializer(serializer_class):
+    """
+    Returns the (cached) CompiledSerializer of a serializer class, e.g
+    `compile_serializer(ProductSerializer)(product)` is `ProductSerializer(product).data`.
+    """
+    return CompiledSerializer(serializer_class)
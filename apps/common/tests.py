@@ -1,3 +1,362 @@
-from django.test import TestCase
+import asyncio, decimal, threading, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+from apps.accounts.models import GuestUser
+from apps.common.db.base import pool_metrics
+from apps.common.decorators import AsyncAtomicContextManager, aatomic, aon_commit
+from apps.common import pg
+from apps.common.executors import aread, get_transaction_threads
+from apps.common.renderers import GuestIDRenderer, ORJSONGuestIDRenderer
+from apps.common.serializers import compile_serializer
+from apps.shop.models import Size
+from apps.shop.utils import size_registry
+
+
+class TestRenderers(TestCase):
+    def test_orjson_renderer_matches_json_renderer(self):
+        data = {
+            "status": "success",
+            "message": _("Products Fetched Successfully"),
+            "data": {
+                "id": uuid.uuid4(),
+                "price": decimal.Decimal("900.25"),
+                "created_at": timezone.now(),
+                "sizes": ["S", "M"],
+                "in_stock": 5,
+                "desc": "Ünïcode désc",
+            },
+        }
+        self.assertEqual(
+            ORJSONGuestIDRenderer().render(dict(data)),
+            GuestIDRenderer().render(dict(data)),
+        )
+        self.assertEqual(ORJSONGuestIDRenderer().render(None), b"")
+
+    def test_orjson_renderer_adds_guest_id(self):
+        request = RequestFactory().get("/")
+        request.user = GuestUser()
+        rendered = ORJSONGuestIDRenderer().render(
+            {"status": "success"}, renderer_context={"request": request}
+        )
+        self.assertEqual(
+            rendered,
+            f'{{"status":"success","guest_id":"{request.user.signed_id}"}}'.encode(),
+        )
+
+
+class TestCompiledSerializer(TestCase):
+    class ItemSerializer(serializers.Serializer):
+        name = serializers.CharField()
+        code = serializers.CharField(source="meta.code", allow_null=True)
+        price = serializers.DecimalField(max_digits=10, decimal_places=2)
+        count = serializers.IntegerField(default=0)
+        note = serializers.CharField(required=False)
+        labels = serializers.ListField(child=serializers.CharField())
+        upper_name = serializers.SerializerMethodField()
+
+        def get_upper_name(self, obj):
+            return obj["name"].upper()
+
+    def test_compiled_serializer_matches_serializer(self):
+        rows = [
+            {
+                "name": "shirt",
+                "meta": {"code": 1},
+                "price": decimal.Decimal("10.5"),
+                "labels": ["a"],
+            },
+            {
+                "name": "cap",
+                "meta": None,
+                "price": None,
+                "count": 3,
+                "note": "x",
+                "labels": [],
+            },
+        ]
+        self.assertEqual(
+            compile_serializer(self.ItemSerializer).many(rows),
+            self.ItemSerializer(rows, many=True).data,
+        )
+
+    def test_custom_to_representation_not_compiled(self):
+        class CustomSerializer(serializers.Serializer):
+            def to_representation(self, instance):
+                return {}
+
+        with self.assertRaises(TypeError):
+            compile_serializer(CustomSerializer)
+
+
+class TestReferenceRegistry(TestCase):
+    def test_lookups_cost_no_query(self):
+        Size.objects.create(value="XS")
+        size_registry.load()
+        with self.assertNumQueries(0), mock.patch(
+            "apps.common.cache.cache", wraps=cache
+        ) as shared_cache:
+            size = async_to_sync(size_registry.aget)("value", "XS")
+            sizes = async_to_sync(size_registry.afilter)("value", ["XS", "XXXL"])
+            missing = async_to_sync(size_registry.aget)("value", "XXXL")
+        self.assertEqual(size.value, "XS")
+        self.assertEqual([s.value for s in sizes], ["XS"])
+        self.assertIsNone(missing)
+        # Nor a cache read, the version is checked in-process
+        shared_cache.aget.assert_not_called()
+
+        # Rows are copies, a caller's change doesn't leak to other lookups
+        size.value = "changed"
+        self.assertEqual(async_to_sync(size_registry.aget)("value", "XS").value, "XS")
+
+    def test_save_and_delete_invalidate(self):
+        size = Size.objects.create(value="XS")
+        size_registry.load()
+        size.value = "XXS"
+        size.save()
+        self.assertIsNone(async_to_sync(size_registry.aget)("value", "XS"))
+        self.assertEqual(async_to_sync(size_registry.aget)("value", "XXS").id, size.id)
+
+        size.delete()
+        self.assertIsNone(async_to_sync(size_registry.aget)("value", "XXS"))
+
+    def test_missing_rows_reload(self):
+        size_registry.load()
+        # Created without invalidating (like by another process whose version bump
+        # isn't seen yet)
+        Size.objects.bulk_create([Size(value="XL")])
+        self.assertIsNone(async_to_sync(size_registry.aget)("value", "XL"))
+        with mock.patch.object(size_registry, "miss_reload_interval", 0):
+            self.assertEqual(
+                async_to_sync(size_registry.aget)("value", "XL").value, "XL"
+            )
+        # Found rows don't reload
+        with self.assertNumQueries(0):
+            async_to_sync(size_registry.afilter)("value", ["XL"])
+
+
+class TestReadExecutor(TestCase):
+    def thread_name(self):
+        return threading.current_thread().name
+
+    @override_settings(DB_READ_EXECUTOR_THREADS=2)
+    def test_reads_run_in_executor_outside_transactions(self):
+        self.assertTrue(async_to_sync(aread)(self.thread_name).startswith("db-read"))
+
+        async def read_in_transaction():
+            async with AsyncAtomicContextManager():
+                return await aread(self.thread_name)
+
+        # A transaction's reads stay on its thread (and connection)
+        self.assertEqual(async_to_sync(read_in_transaction)(), self.thread_name())
+
+
+class TestAsyncAtomic(TransactionTestCase):
+    # The transaction threads' connections only see committed data
+
+    @staticmethod
+    def backend():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_backend_pid(), txid_current()")
+            return (*cursor.fetchone(), threading.current_thread().name)
+
+    @staticmethod
+    def sleep():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_sleep(1)")
+
+    @override_settings(DB_TRANSACTION_THREADS=4)
+    def test_concurrent_transactions_pinned(self):
+        self.addCleanup(get_transaction_threads().shutdown)
+        committed = []
+
+        async def request(i):
+            # Like an ASGI request, with its own thread sensitive context
+            seen = []
+            async with AsyncAtomicContextManager():
+                seen.append(await sync_to_async(self.backend)())
+                await Size.objects.acreate(value=f"s{i}")
+                await aon_commit(lambda: committed.append(i))
+                # Let the other requests run in between
+                await asyncio.sleep(0.01)
+                try:
+                    async with AsyncAtomicContextManager():
+                        seen.append(await sync_to_async(self.backend)())
+                        await Size.objects.acreate(value=f"r{i}")
+                        raise ValueError
+                except ValueError:
+                    pass
+                seen.append(await aread(self.backend))
+            return seen
+
+        async def requests():
+            return await asyncio.gather(*(request(i) for i in range(32)))
+
+        results = asyncio.run(requests())
+        # Every statement of a transaction ran on its connection, in its transaction,
+        # which no other request shared
+        for seen in results:
+            self.assertEqual(len(set(seen)), 1)
+        self.assertEqual(len({seen[0][1] for seen in results}), 32)
+        # Savepoints were rolled back alone, and the hooks ran on commit
+        self.assertEqual(
+            set(Size.objects.values_list("value", flat=True)),
+            {f"s{i}" for i in range(32)},
+        )
+        self.assertEqual(sorted(committed), list(range(32)))
+        # On at most DB_TRANSACTION_THREADS threads
+        threads = {seen[0][2] for seen in results}
+        self.assertLessEqual(len(threads), 4)
+        self.assertTrue(all(name.startswith("db-transaction") for name in threads))
+
+    @override_settings(DB_TRANSACTION_THREADS=4)
+    def test_statement_timeout_and_rollback_hooks(self):
+        self.addCleanup(get_transaction_threads().shutdown)
+        committed = []
+
+        @aatomic(statement_timeout=50)
+        async def slow():
+            await aon_commit(lambda: committed.append("slow"))
+            await sync_to_async(self.backend)()
+            await sync_to_async(self.sleep)()
+
+        with self.assertRaises(OperationalError):
+            asyncio.run(slow())
+        self.assertEqual(committed, [])
+
+        def statement_timeout():
+            with connection.cursor() as cursor:
+                cursor.execute("SHOW statement_timeout")
+                return cursor.fetchone()[0]
+
+        async def nested():
+            async with AsyncAtomicContextManager(statement_timeout=1000):
+                async with AsyncAtomicContextManager(statement_timeout=50):
+                    inner = await sync_to_async(statement_timeout)()
+                outer = await sync_to_async(statement_timeout)()
+
+            async def hook():
+                committed.append("async")
+
+            async with AsyncAtomicContextManager():
+                await aon_commit(hook)
+            await asyncio.sleep(0)
+            return inner, outer
+
+        # The enclosing transaction's timeout is restored after a nested block
+        self.assertEqual(asyncio.run(nested()), ("50ms", "1s"))
+        self.assertEqual(committed, ["async"])
+
+    @override_settings(DB_TRANSACTION_THREADS=1)
+    def test_cancelled_blocks_release_their_thread(self):
+        self.addCleanup(get_transaction_threads().shutdown)
+        enter = AsyncAtomicContextManager._enter
+
+        def slow_enter(self, state):
+            enter(self, state)
+            time.sleep(0.2)
+
+        async def request(value, opened=None, close=None):
+            async with AsyncAtomicContextManager():
+                await Size.objects.acreate(value=value)
+                if opened:
+                    opened.set()
+                    await close.wait()
+
+        async def cancel(task):
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        async def requests():
+            # Cancelled while its block is being opened on the (only) thread
+            with mock.patch.object(AsyncAtomicContextManager, "_enter", slow_enter):
+                await cancel(asyncio.ensure_future(request("c1")))
+            # Cancelled while waiting for the thread
+            opened, close = asyncio.Event(), asyncio.Event()
+            holder = asyncio.ensure_future(request("h", opened, close))
+            await opened.wait()
+            await cancel(asyncio.ensure_future(request("c2")))
+            close.set()
+            await holder
+            # The thread is free again, without a transaction left open on it
+            await asyncio.wait_for(request("ok"), timeout=5)
+
+        asyncio.run(requests())
+        self.assertEqual(set(Size.objects.values_list("value", flat=True)), {"h", "ok"})
+
+
+class TestConnectionPool(TransactionTestCase):
+    # The requests' threads' connections only see committed data
+
+    def test_requests_reuse_pooled_connections(self):
+        self.assertIsNotNone(connection.pool)
+
+        def request():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_backend_pid()")
+                pid = cursor.fetchone()[0]
+            # Like at the end of a request
+            connection.close()
+            return pid
+
+        def request_thread():
+            # Like under ASGI, every request on its own thread
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                return executor.submit(request).result()
+
+        name = f"default:{connection.settings_dict['NAME']}"
+        before = pool_metrics()[name]
+        pids = {request_thread() for _ in range(5)}
+        # The connections are taken from the pool, and given back on close
+        metrics = pool_metrics()[name]
+        self.assertEqual(metrics["requests"], before["requests"] + 5)
+        self.assertEqual(metrics["in_use"], before["in_use"])
+        self.assertLessEqual(len(pids), metrics["size"])
+
+    @override_settings(DB_READ_EXECUTOR_THREADS=2)
+    def test_read_executor_returns_connections(self):
+        def read():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+
+        name = f"default:{connection.settings_dict['NAME']}"
+        before = pool_metrics()[name]
+        for _ in range(4):
+            async_to_sync(aread)(read)
+        # The executor's threads don't keep them checked out between reads
+        metrics = pool_metrics()[name]
+        self.assertEqual(metrics["requests"], before["requests"] + 4)
+        self.assertEqual(metrics["in_use"], before["in_use"])
+
+
+class TestAsyncPool(TransactionTestCase):
+    def test_one_pool_per_loop(self):
+        async def first_use():
+            pools = await asyncio.gather(*(pg.aget_pool() for _ in range(5)))
+            await pg.afetchone("SELECT 1")
+            return pools, list(pg._pool_connections)
+
+        # Concurrent first uses share one pool
+        pools, connections = asyncio.run(first_use())
+        self.assertEqual(len({id(pool) for pool in pools}), 1)
+        self.assertTrue(connections)
+
+        async def replace():
+            try:
+                return await pg.aget_pool()
+            finally:
+                await pg.aclose_pool()
+
+        # The pool of a finished loop is replaced, and its connections closed
+        self.assertIsNot(asyncio.run(replace()), pools[0])
+        self.assertTrue(all(connection.closed for connection in connections))
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.general.models import SiteDetail
+from apps.general.utils import site_detail_cache
+
+
+@receiver(post_save, sender=SiteDetail)
+@receiver(post_delete, sender=SiteDetail)
+def invalidate_site_detail_cache(sender, **kwargs):
+    site_detail_cache.invalidate()
@@ -1,5 +1,11 @@
+from unittest import mock
+from cachetools import TTLCache
+from django.core.cache import cache
 from rest_framework.test import APITestCase
 
+from apps.common.cache import local_versions
+from apps.general.models import SiteDetail
+
 
 class TestGeneral(APITestCase):
     def test_retrieve_sitedetail(self):
@@ -10,3 +16,51 @@ class TestGeneral(APITestCase):
         self.assertEqual(result["message"], "Site Details fetched")
         keys = ["name", "email", "phone", "address", "fb", "tw", "wh", "ig"]
         self.assertTrue(all(item in result["data"] for item in keys))
+
+    def test_retrieve_sitedetail_cached(self):
+        sitedetail, _ = SiteDetail.objects.get_or_create()
+        response = self.client.get("/api/v1/general/site-detail/")
+        etag = response["ETag"]
+
+        # Served from the in-process copy and version (whatever the cache backend is),
+        # and revalidated without a body
+        with self.assertNumQueries(0), mock.patch(
+            "apps.common.cache.cache", wraps=cache
+        ) as shared_cache:
+            response = self.client.get("/api/v1/general/site-detail/")
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(
+                "/api/v1/general/site-detail/", HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(response.status_code, 304)
+        shared_cache.aget.assert_not_called()
+
+        # Saving the details invalidates the copy
+        sitedetail.name = "New Store"
+        sitedetail.save()
+        response = self.client.get(
+            "/api/v1/general/site-detail/", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["name"], "New Store")
+        self.assertNotEqual(response["ETag"], etag)
+
+        # Another worker's save is seen once this one checks the version again
+        with mock.patch("apps.common.cache.local_versions", TTLCache(100, 60)):
+            sitedetail.name = "Other Store"
+            sitedetail.save()
+        response = self.client.get("/api/v1/general/site-detail/")
+        self.assertEqual(response.json()["data"]["name"], "New Store")
+        local_versions.clear()
+        response = self.client.get("/api/v1/general/site-detail/")
+        self.assertEqual(response.json()["data"]["name"], "Other Store")
+
+        # A change not made through the model is picked up once the copy is too old
+        SiteDetail.objects.update(name="Renamed Store")
+        etag = response["ETag"]
+        with mock.patch("apps.general.utils.SITE_DETAIL_TIMEOUT", 0):
+            response = self.client.get(
+                "/api/v1/general/site-detail/", HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["name"], "Renamed Store")
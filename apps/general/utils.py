@@ -0,0 +1,45 @@
+import time
+
+from apps.common.cache import VersionedCache, make_etag
+from .models import SiteDetail
+from .serializers import SiteDetailSerializer
+
+# Bumped when the site details are saved (see signals), so every worker reloads them
+site_detail_cache = VersionedCache("sitedetail")
+# Seconds this worker's copy is used at most, in case a change didn't go through
+# the model (e.g. a raw UPDATE or loaddata)
+SITE_DETAIL_TIMEOUT = 300
+# (version, loaded_at, etag, serialized data) of this worker's copy of the site details
+_site_detail = None
+
+
+async def fetch_site_detail():
+    """
+    Return the ETag and serialized data of the site details.
+
+    The data is kept in-process, and so is the version it's checked against for
+    CACHE_VERSION_CHECK_INTERVAL seconds (see `VersionedCache`), so most calls run no
+    query and don't read the cache.
+    The singleton is loaded (and created if missing) again once the version changes
+    or the copy is older than SITE_DETAIL_TIMEOUT. The ETag is built from the data,
+    so it's the same on every worker and changes with the data alone.
+    """
+    global _site_detail
+    # Read before the row, so a save made during the load makes the next call reload
+    version = await site_detail_cache.aversion()
+    if (
+        _site_detail is None
+        or _site_detail[0] != version
+        or time.monotonic() - _site_detail[1] >= SITE_DETAIL_TIMEOUT
+    ):
+        sitedetail, created = await SiteDetail.objects.aget_or_create()
+        if created:  # Creating it bumped the version
+            version = await site_detail_cache.aversion()
+        data = SiteDetailSerializer(sitedetail).data
+        _site_detail = (
+            version,
+            time.monotonic(),
+            make_etag("sitedetail", data),
+            data,
+        )
+    return _site_detail[2:]
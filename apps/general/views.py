@@ -1,15 +1,17 @@
 from adrf.views import APIView
 from drf_spectacular.utils import extend_schema
+from apps.common.cache import not_modified_response, set_etag
 from apps.common.responses import CustomResponse
 
 from apps.common.serializers import SuccessResponseSerializer
-from .models import Message, SiteDetail, Subscriber
+from .models import Message, Subscriber
 from .serializers import (
     MessageSerializer,
     SiteDetailSerializer,
     SiteDetailResponseSerializer,
     SubscriberSerializer,
 )
+from .utils import fetch_site_detail
 
 tags = ["General"]
 
@@ -19,16 +21,16 @@ class SiteDetailView(APIView):
     API view for retrieving site details.
 
     This view provides an endpoint to fetch details about the site/application,
-    including general information and social media links. It uses asynchronous
-    operations to handle database interactions.
+    including general information and social media links. The serialized details
+    are kept in-process and invalidated when they're saved.
 
     Attributes:
         serializer_class (Type[SiteDetailSerializer]): The serializer class used to validate and serialize the SiteDetail model.
 
     Methods:
         get(request: Request) -> Response:
-            Retrieves the site details, serializes the data, and returns it in a successful response.
-            Uses the `SiteDetailSerializer` to serialize the `SiteDetail` instance and returns it in a `CustomResponse`.
+            Returns the cached serialized site details in a successful response,
+            or a 304 response if the client's copy is still current.
 
     Schema:
         The `@extend_schema` decorator is used to define the OpenAPI schema for this endpoint.
@@ -47,20 +49,24 @@ class SiteDetailView(APIView):
         """
         Handle GET requests to fetch site details.
 
-        This method asynchronously retrieves the `SiteDetail` instance, creates one if it does not exist,
-        serializes the data using `SiteDetailSerializer`, and returns it in a `CustomResponse`.
+        This method returns the in-process copy of the serialized `SiteDetail` instance
+        (loaded, and created if it does not exist, after each change and every few
+        minutes) in a `CustomResponse`, with an ETag so clients can revalidate it with
+        If-None-Match.
 
         Args:
             request (Request): The HTTP request object.
 
         Returns:
-            Response: A `CustomResponse` containing the serialized site details.
+            Response: A `CustomResponse` containing the serialized site details,
+            or a 304 response if they haven't changed.
         """
-        sitedetail, created = await SiteDetail.objects.aget_or_create()
-        serializer = self.serializer_class(sitedetail)
-        return CustomResponse.success(
-            message="Site Details fetched", data=serializer.data
-        )
+        etag, data = await fetch_site_detail()
+        not_modified = not_modified_response(request, etag)
+        if not_modified:
+            return not_modified
+        response = CustomResponse.success(message="Site Details fetched", data=data)
+        return set_etag(response, etag)
 
 
 class SubscribeView(APIView):
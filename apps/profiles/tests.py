@@ -1,9 +1,11 @@
 from unittest import mock
 import uuid
-from rest_framework.test import APITestCase
+from django.test import override_settings
+from rest_framework.test import APITestCase, APITransactionTestCase
 
 from apps.accounts.models import User
 from apps.accounts.test_utils import TestAccountUtil
+from apps.common import executors
 from apps.common.exceptions import ErrorCode
 from apps.profiles.test_utils import TestProfileUtil
 
@@ -259,3 +261,24 @@ class TestProfiles(APITestCase):
         result = response.json()
         self.assertEqual(result["status"], "success")
         self.assertEqual(result["message"], "Orders Fetched Successfully")
+
+
+class TestProfilesReadExecutor(APITransactionTestCase):
+    # The executor threads' connections only see committed data
+
+    def setUp(self):
+        self.user = TestAccountUtil.new_user()
+        auth_token = TestAccountUtil.auth_token(self.user)
+        self.bearer = {"HTTP_AUTHORIZATION": f"Bearer {auth_token}"}
+        self.order = TestProfileUtil.order(self.user)
+
+    @override_settings(DB_READ_EXECUTOR_THREADS=2)
+    def test_retrieve_orders(self):
+        with mock.patch.object(
+            executors, "_run_read", wraps=executors._run_read
+        ) as run_read:
+            response = self.client.get(TestProfiles.orders_url, **self.bearer)
+        self.assertEqual(response.status_code, 200)
+        orders = response.json()["data"]["orders"]
+        self.assertEqual([order["tx_ref"] for order in orders], [self.order.tx_ref])
+        self.assertTrue(run_read.called)
@@ -1,11 +1,13 @@
 from adrf.views import APIView
 from drf_spectacular.utils import extend_schema
 from apps.common.exceptions import NotFoundError, ValidationErr
+from apps.common.executors import alist
 from apps.common.paginators import CustomPagination
 from apps.common.permissions import IsAuthenticatedCustom
 from apps.common.utils import set_dict_attr
 from apps.common.responses import CustomResponse
-from apps.shop.models import Country, Order, ShippingAddress
+from apps.shop.models import Order, ShippingAddress
+from apps.shop.utils import country_registry
 from .schema_examples import (
     ACCOUNT_DEACTIVATION_RESPONSE_EXAMPLE,
     ORDERS_PARAM_EXAMPLE,
@@ -18,7 +20,6 @@ from .schema_examples import (
     SHIPPING_ADDRESS_UPDATE_RESPONSE_EXAMPLE,
     SHIPPING_ADDRESSES_RESPONSE_EXAMPLE,
 )
-from asgiref.sync import sync_to_async
 
 from .serializers import (
     OrdersResponseDataSerializer,
@@ -126,7 +127,7 @@ class ShippingAddressesView(APIView):
     )
     async def get(self, request, *args, **kwargs):
         user = request.user
-        shipping_addresses = await sync_to_async(list)(
+        shipping_addresses = await alist(
             ShippingAddress.objects.select_related("country").filter(user=user)
         )
         serializer = self.serializer_class(shipping_addresses, many=True)
@@ -148,7 +149,7 @@ class ShippingAddressesView(APIView):
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
         country = data.pop("country")
-        country = await Country.objects.aget_or_none(name=country)
+        country = await country_registry.aget("name", country)
         if not country:
             raise ValidationErr("country", "Invalid country selected")
         shipping_address, _ = await ShippingAddress.objects.select_related(
@@ -220,7 +221,7 @@ class ShippingAddressView(APIView):
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
         country = data.pop("country")
-        country = await Country.objects.aget_or_none(name=country)
+        country = await country_registry.aget("name", country)
         if not country:
             raise ValidationErr("country", "Invalid country selected")
         shipping_address.country = country
@@ -284,13 +285,13 @@ class OrdersView(APIView):
         if delivery_status:
             filter_["delivery_status"] = delivery_status
 
-        orders = await sync_to_async(list)(
+        orders = (
             Order.objects.filter(**filter_)
             .select_related("user", "coupon")
             .prefetch_related("orderitems", "orderitems__product")
-            .order_by("-created_at")
+            .order_by("-created_at", "-id")
         )
-        paginated_data = self.paginator_class.paginate_queryset(orders, request)
+        paginated_data = await self.paginator_class.apaginate_queryset(orders, request)
         serializer = self.serializer_class(paginated_data)
         return CustomResponse.success(
             message="Orders Fetched Successfully", data=serializer.data
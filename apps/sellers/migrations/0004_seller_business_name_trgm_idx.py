@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-17 01:05
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sellers", "0003_seller_delete_sellerapplication"),
+        # Creates the pg_trgm extension
+        ("shop", "0010_product_name_trgm_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="seller",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["business_name"],
+                name="seller_business_name_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
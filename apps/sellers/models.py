@@ -1,4 +1,5 @@
 from autoslug import AutoSlugField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 from apps.accounts.models import User
@@ -67,3 +68,13 @@ class Seller(BaseModel):
 
     def __str__(self):
         return f"Seller for {self.business_name} by {self.full_name}"
+
+    class Meta:
+        indexes = [
+            # For fuzzy product searches by seller name
+            GinIndex(
+                fields=["business_name"],
+                opclasses=["gin_trgm_ops"],
+                name="seller_business_name_trgm_idx",
+            ),
+        ]
@@ -11,7 +11,6 @@ from apps.common.permissions import (
 )
 from apps.common.responses import CustomResponse
 from apps.common.utils import (
-    REVIEWS_AND_RATING_WISHLISTED_CARTED_ANNOTATION,
     get_user_or_guest,
     set_dict_attr,
     validate_request_data,
@@ -21,7 +20,12 @@ from apps.profiles.serializers import OrdersResponseDataSerializer
 from apps.sellers.utils import validate_category_sizes_colors
 from apps.shop.schema_examples import PRODUCTS_PARAM_EXAMPLE
 from apps.shop.serializers import ProductSerializer, ProductsResponseDataSerializer
-from apps.shop.utils import fetch_products
+from apps.shop.utils import (
+    apply_wishlist_overlay,
+    category_registry,
+    country_registry,
+    fetch_product_cards,
+)
 from .models import Seller
 from .schema_examples import (
     PRODUCT_CREATE_REQUEST_EXAMPLE,
@@ -33,8 +37,7 @@ from .schema_examples import (
     SELLER_PRODUCTS_RESPONSE,
 )
 from .serializers import ProductCreateSerializer, SellerSerializer
-from apps.shop.models import Category, Color, Country, Order, OrderItem, Product, Size
-from asgiref.sync import sync_to_async
+from apps.shop.models import Color, Order, OrderItem, Product, Size
 
 tags = ["Sellers"]
 
@@ -65,15 +68,13 @@ class SellersApplicationView(APIView):
         user = request.user
         data = validate_request_data(request, self.serializer_class_)
         country = data.pop("country")
-        country = await Country.objects.aget_or_none(name=country)
+        country = await country_registry.aget("name", country)
         if not country:
             raise ValidationErr("country", "Invalid country selected")
         data["country"] = country
         product_categories = data.pop("product_categories")
         product_categories = product_categories["name"]
-        categories = await sync_to_async(list)(
-            Category.objects.filter(name__in=product_categories)
-        )
+        categories = await category_registry.afilter("name", product_categories)
         if len(categories) < 1:
             raise ValidationErr("product_categories", "No valid category was selected")
         application, _ = await Seller.objects.aupdate_or_create(
@@ -109,11 +110,12 @@ class ProductsBySellerView(APIView):
         )
         if not seller:
             raise NotFoundError(err_msg="No approved seller with that slug")
-        products = await fetch_products(request, user, guest, {"seller": seller})
-        paginated_data = self.paginator_class.paginate_queryset(products, request)
-        serializer = self.serializer_class(paginated_data)
+        data = await fetch_product_cards(
+            request, self.paginator_class, {"seller": seller}
+        )
+        await apply_wishlist_overlay(data["products"], user, guest)
         return CustomResponse.success(
-            message="Seller Products Fetched Successfully", data=serializer.data
+            message="Seller Products Fetched Successfully", data=data
         )
 
     @extend_schema(
@@ -144,16 +146,12 @@ class ProductsBySellerView(APIView):
         await product.colors.aadd(*colors)
 
         # Return refreshed product
-        product = await (
-            Product.objects.select_related("category", "seller", "seller__user")
-            .prefetch_related("sizes", "colors", "reviews", "reviews__user")
-            .annotate(**REVIEWS_AND_RATING_WISHLISTED_CARTED_ANNOTATION(user, None))
-            .aget(id=product.id)
-        )
-        serializer = ProductSerializer(product)
-        return CustomResponse.success(
-            message="Product Updated Successfully", data=serializer.data
-        )
+        product = await Product.objects.select_related(
+            "category", "seller", "seller__user"
+        ).aget(id=product.id)
+        data = ProductSerializer(product).data
+        await apply_wishlist_overlay([data], user, None)
+        return CustomResponse.success(message="Product Updated Successfully", data=data)
 
     @extend_schema(
         summary="Product Delete",
@@ -255,7 +253,7 @@ class OrdersView(APIView):
             filter_["delivery_status"] = delivery_status
 
         # Fetch orders with orderitems that is targeted towards the seller products
-        orders = await sync_to_async(list)(
+        orders = (
             Order.objects.filter(**filter_)
             .select_related("user", "coupon")
             .prefetch_related(
@@ -266,9 +264,9 @@ class OrdersView(APIView):
                     ).select_related("product"),
                 )
             )
-            .order_by("-created_at")
+            .order_by("-created_at", "-id")
         )
-        paginated_data = self.paginator_class.paginate_queryset(orders, request)
+        paginated_data = await self.paginator_class.apaginate_queryset(orders, request)
         serializer = self.serializer_class(paginated_data)
         return CustomResponse.success(
             message="Orders Fetched Successfully", data=serializer.data
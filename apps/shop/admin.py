@@ -38,7 +38,7 @@ class ProductAdmin(BaseModelAdmin):
         "updated_at",
     )
     list_filter = list_display
-    readonly_fields = ("slug",)
+    readonly_fields = ("slug", "reviews_count", "avg_rating")
 
 
 class CountryAdmin(BaseModelAdmin):
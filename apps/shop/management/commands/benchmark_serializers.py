@@ -0,0 +1,63 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from apps.accounts.models import User
+from apps.common.serializers import compile_serializer
+from apps.sellers.models import Seller
+from apps.shop.models import Category, Product
+from apps.shop.serializers import ProductsResponseDataSerializer
+import logging, timeit
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Compare the serialization time of a product page with DRF and the compiled serializer"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--items", type=int, default=100, help="Number of products on the page"
+        )
+        parser.add_argument(
+            "--iterations", type=int, default=200, help="Number of pages timed"
+        )
+
+    def handle(self, **options) -> None:
+        items, iterations = options["items"], options["iterations"]
+        # In memory products, so only the serialization is timed
+        user = User(first_name="Test", last_name="Seller", email="seller@example.com")
+        seller = Seller(user=user, business_name="Test Business", slug="test-business")
+        category = Category(name="Test Category", slug="test-category")
+        products = [
+            Product(
+                seller=seller,
+                category=category,
+                name=f"Product {i}",
+                slug=f"product-{i}",
+                desc="This is a good product",
+                price_old=Decimal("1000.25"),
+                price_current=Decimal("900.25"),
+                size_values=["S", "M", "L"],
+                color_values=["Red", "Blue"],
+            )
+            for i in range(items)
+        ]
+        page = {"items": products, "per_page": items, "current_page": 1, "last_page": 1}
+        compiled = compile_serializer(ProductsResponseDataSerializer)
+        if compiled(page) != ProductsResponseDataSerializer(page).data:
+            logger.warning("The serializers outputs differ")
+
+        timings = {}
+        for name, serialize in (
+            (
+                "ProductsResponseDataSerializer",
+                lambda: ProductsResponseDataSerializer(page).data,
+            ),
+            ("Compiled", lambda: compiled(page)),
+        ):
+            # Best of a few runs, to leave out the noise of other processes
+            seconds = min(timeit.repeat(serialize, number=iterations, repeat=5))
+            timings[name] = seconds / iterations * 1e3
+            logger.info(f"{name}: {timings[name]:.2f}ms per page of {items} products")
+        speedup = timings["ProductsResponseDataSerializer"] / timings["Compiled"]
+        logger.info(f"The compiled serializer is {speedup:.1f}x faster")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.common.cache import cache_is_shared
+from apps.shop.utils import product_listing_cache
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Show the hit/miss counters of the product listing cache (needs a shared cache backend)"
+
+    def handle(self, **options) -> None:
+        if not cache_is_shared():
+            # This process' own cache, not the server's
+            raise CommandError(
+                "The cache backend is per process, the server's counters can't be read."
+            )
+        stats = product_listing_cache.stats()
+        logger.info(
+            f"Listing cache: {stats['hits']} hits, {stats['misses']} misses, hit ratio {stats['hit_ratio']}"
+        )
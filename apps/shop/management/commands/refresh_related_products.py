@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.shop.models import Product
+from apps.shop.utils import product_listing_cache, update_product_related_ids
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Refresh the precomputed related products of all products"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of products updated per transaction",
+        )
+
+    def handle(self, **options) -> None:
+        batch_size = options["batch_size"]
+        # Soft deleted products are refreshed too
+        products = Product.objects.unfiltered().order_by("id")
+        last_id = None
+        total = 0
+        logger.info("Refreshing related products")
+        while True:
+            batch = products
+            if last_id:
+                batch = batch.filter(id__gt=last_id)
+            ids = list(batch.values_list("id", flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                total += update_product_related_ids(
+                    Product.objects.unfiltered().filter(id__in=ids)
+                )
+            last_id = ids[-1]
+            logger.info(f"{total} products refreshed")
+        # update() skips the signals that invalidate the cached listings
+        product_listing_cache.invalidate()
+        logger.info("Related products refreshed")
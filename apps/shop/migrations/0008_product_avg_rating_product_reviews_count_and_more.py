@@ -0,0 +1,48 @@
+# Generated by Django 5.0.7 on 2026-10-16 23:48
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_product_ratings(apps, schema_editor):
+    Product = apps.get_model("shop", "Product")
+    Review = apps.get_model("shop", "Review")
+    reviews = Review.objects.filter(product=OuterRef("pk")).order_by().values("product")
+    Product.objects.update(
+        reviews_count=Coalesce(
+            Subquery(reviews.annotate(count=Count("id")).values("count")), Value(0)
+        ),
+        avg_rating=Coalesce(
+            Subquery(reviews.annotate(avg=Avg("rating")).values("avg")),
+            Value(0),
+            output_field=FloatField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0007_alter_product_slug"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="avg_rating",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="reviews_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="product_listing_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_product_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.7 on 2026-10-17 00:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_product_search_vectors(apps, schema_editor):
+    Product = apps.get_model("shop", "Product")
+    Category = apps.get_model("shop", "Category")
+    category_name = Category.objects.filter(id=OuterRef("category_id")).values("name")
+    Product.objects.update(
+        search_vector=SearchVector("name", weight="A", config="english")
+        + SearchVector(Subquery(category_name), weight="B", config="english")
+        + SearchVector("desc", weight="C", config="english")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0008_product_avg_rating_product_reviews_count_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="product_search_vector_idx"
+            ),
+        ),
+        migrations.RunPython(
+            backfill_product_search_vectors, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.7 on 2026-10-17 01:40
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import migrations, models
+from django.db.models import OuterRef
+
+
+def backfill_product_size_color_values(apps, schema_editor):
+    Product = apps.get_model("shop", "Product")
+    sizes = Product.sizes.through.objects.filter(product_id=OuterRef("pk"))
+    colors = Product.colors.through.objects.filter(product_id=OuterRef("pk"))
+    Product.objects.update(
+        size_values=ArraySubquery(sizes.order_by("id").values("size__value")),
+        color_values=ArraySubquery(colors.order_by("id").values("color__value")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0010_product_name_trgm_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="color_values",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.CharField(max_length=20),
+                blank=True,
+                default=list,
+                editable=False,
+                size=None,
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="size_values",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.CharField(max_length=5),
+                blank=True,
+                default=list,
+                editable=False,
+                size=None,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["size_values"], name="product_size_values_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["color_values"], name="product_color_values_idx"
+            ),
+        ),
+        migrations.RunPython(
+            backfill_product_size_color_values, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.7 on 2026-10-17 09:12
+
+import django.contrib.postgres.fields
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_product_related_ids(apps, schema_editor):
+    Product = apps.get_model("shop", "Product")
+    OrderItem = apps.get_model("shop", "OrderItem")
+    co_purchases = (
+        OrderItem.objects.filter(
+            product=OuterRef("pk"),
+            order__payment_status="SUCCESSFUL",
+            order__orderitems__product=OuterRef(OuterRef("pk")),
+        )
+        .order_by()
+        .values("product")
+        .annotate(count=Count("order", distinct=True))
+        .values("count")
+    )
+    related = (
+        Product.objects.filter(
+            category_id=OuterRef("category_id"),
+            in_stock__gt=0,
+            deleted_at__isnull=True,
+        )
+        .exclude(id=OuterRef("id"))
+        .annotate(co_purchases=Coalesce(Subquery(co_purchases), Value(0)))
+        .order_by("-co_purchases", "-avg_rating", "-reviews_count", "-created_at")
+        .values("id")[:10]
+    )
+    Product.objects.update(related_ids=ArraySubquery(related))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0011_product_color_values_product_size_values_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="related_ids",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.UUIDField(),
+                blank=True,
+                default=list,
+                editable=False,
+                size=None,
+            ),
+        ),
+        migrations.RunPython(backfill_product_related_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-17 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0012_product_related_ids"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["product", "rating", "created_at"],
+                name="review_product_rating_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.0.7 on 2026-10-17 11:20
+
+import apps.common.models
+from django.db import migrations
+
+
+def backfill_image_urls(apps, schema_editor):
+    Category = apps.get_model("shop", "Category")
+    Product = apps.get_model("shop", "Product")
+    # The URLs are resolved by the fields when saved
+    for category in Category.objects.only("image").iterator(chunk_size=1000):
+        category.save(update_fields=["image_url"])
+    products = Product.objects.only("image1", "image2", "image3")
+    for product in products.iterator(chunk_size=1000):
+        product.save(update_fields=["image1_url", "image2_url", "image3_url"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0013_review_product_rating_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="image_url",
+            field=apps.common.models.FileURLField(
+                blank=True,
+                editable=False,
+                file_field="image",
+                max_length=500,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="image1_url",
+            field=apps.common.models.FileURLField(
+                blank=True,
+                editable=False,
+                file_field="image1",
+                max_length=500,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="image2_url",
+            field=apps.common.models.FileURLField(
+                blank=True,
+                editable=False,
+                file_field="image2",
+                max_length=500,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="image3_url",
+            field=apps.common.models.FileURLField(
+                blank=True,
+                editable=False,
+                file_field="image3",
+                max_length=500,
+                null=True,
+            ),
+        ),
+        migrations.RunPython(backfill_image_urls, migrations.RunPython.noop),
+    ]
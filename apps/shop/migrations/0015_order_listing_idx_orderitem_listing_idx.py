@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-17 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0014_category_image_url_product_image_urls"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["-created_at", "-id"], name="order_listing_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="orderitem_listing_idx"
+            ),
+        ),
+    ]
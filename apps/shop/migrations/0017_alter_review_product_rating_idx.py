@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-17 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0016_review_product_created_idx"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="review",
+            name="review_product_rating_idx",
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["product", "rating", "created_at", "id"],
+                name="review_product_rating_idx",
+            ),
+        ),
+    ]
@@ -1,10 +1,18 @@
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
-from django.db.models.fields.files import ImageFieldFile
+from django.db.models.functions import Upper
 from django.core.validators import MaxValueValidator, MinValueValidator
 from autoslug import AutoSlugField
 from django.conf import settings
 from apps.accounts.models import GuestUser, User
-from apps.common.models import BaseModel, IsDeletedModel, generate_unique_code
+from apps.common.models import (
+    BaseModel,
+    FileURLField,
+    IsDeletedModel,
+    generate_unique_code,
+)
 from apps.shop.choices import (
     DELIVERY_STATUS_CHOICES,
     PAYMENT_GATEWAY_CHOICES,
@@ -14,6 +22,7 @@ from apps.shop.choices import (
 
 CATEGORY_IMAGE_PREFIX = "category_images/"
 PRODUCT_IMAGE_PREFIX = "product_images/"
+SEARCH_CONFIG = "english"
 
 
 class Size(BaseModel):
@@ -60,6 +69,7 @@ class Category(BaseModel):
         name (str): The category name, unique for each instance.
         slug (str): The slug generated from the name, used in URLs.
         image (ImageField): An image representing the category.
+        image_url (str): The URL of the image (stored on save).
 
     Methods:
         __str__():
@@ -69,6 +79,14 @@ class Category(BaseModel):
     name = models.CharField(max_length=100, unique=True)
     slug = AutoSlugField(populate_from="name", unique=True, always_update=True)
     image = models.ImageField(upload_to=CATEGORY_IMAGE_PREFIX)
+    image_url = FileURLField(file_field="image")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Keep the stored name so products' search vectors are only rebuilt on rename
+        instance._loaded_name = instance.__dict__.get("name")
+        return instance
 
     def __str__(self):
         return str(self.name)
@@ -118,20 +136,22 @@ class Product(IsDeletedModel):
         sizes (ManyToManyField): The available sizes for the product.
         colors (ManyToManyField): The available colors for the product.
         in_stock (int): The quantity of the product in stock.
+        reviews_count (int): The number of reviews of the product (denormalized, see `apps.shop.signals`).
+        avg_rating (float): The average rating of the product's reviews (denormalized, see `apps.shop.signals`).
+        search_vector (SearchVectorField): Weighted tsvector of the name, category name and description (see `apps.shop.signals`).
+        size_values (ArrayField): The values of the product's sizes (denormalized, see `apps.shop.signals`).
+        color_values (ArrayField): The values of the product's colors (denormalized, see `apps.shop.signals`).
+        related_ids (ArrayField): Ids of the products shown as related, best first (precomputed, see `apps.shop.utils.update_product_related_ids`).
         image1 (ImageField): The first image of the product.
         image2 (ImageField): The second image of the product.
         image3 (ImageField): The third image of the product.
+        image1_url (str): The URL of the first image (stored on save).
+        image2_url (str): The URL of the second image (stored on save).
+        image3_url (str): The URL of the third image (stored on save).
 
     Properties:
-        image1_url (str): The URL of the first image.
-        image2_url (str): The URL of the second image.
-        image3_url (str): The URL of the third image.
         default_size (Size): The default size of the product.
         default_color (Color): The default color of the product.
-
-    Methods:
-        return_img_url(image: ImageFieldFile):
-            Returns the URL of the given image field or None if not available.
     """
 
     seller = models.ForeignKey(
@@ -148,34 +168,45 @@ class Product(IsDeletedModel):
     sizes = models.ManyToManyField(Size, related_name="products", blank=True)
     colors = models.ManyToManyField(Color, related_name="products", blank=True)
     in_stock = models.IntegerField(default=5)
+    reviews_count = models.PositiveIntegerField(default=0)
+    avg_rating = models.FloatField(default=0)
+    search_vector = SearchVectorField(null=True, editable=False)
+    size_values = ArrayField(
+        models.CharField(max_length=5), default=list, blank=True, editable=False
+    )
+    color_values = ArrayField(
+        models.CharField(max_length=20), default=list, blank=True, editable=False
+    )
+    related_ids = ArrayField(
+        models.UUIDField(), default=list, blank=True, editable=False
+    )
 
     # Only 3 images are allowed
     image1 = models.ImageField(upload_to=PRODUCT_IMAGE_PREFIX)
     image2 = models.ImageField(upload_to=PRODUCT_IMAGE_PREFIX, blank=True)
     image3 = models.ImageField(upload_to=PRODUCT_IMAGE_PREFIX, blank=True)
-
-    def return_img_url(self, image: ImageFieldFile):
-        try:
-            url = image.url
-        except:
-            url = None
-        return url
-
-    @property
-    def image1_url(self):
-        return self.return_img_url(self.image1)
-
-    @property
-    def image2_url(self):
-        return self.return_img_url(self.image2)
-
-    @property
-    def image3_url(self):
-        return self.return_img_url(self.image3)
+    image1_url = FileURLField(file_field="image1")
+    image2_url = FileURLField(file_field="image2")
+    image3_url = FileURLField(file_field="image3")
 
     def __str__(self):
         return str(self.name)
 
+    class Meta:
+        indexes = [
+            # Listings are ordered (and cursor paginated) newest first
+            models.Index(fields=["-created_at", "-id"], name="product_listing_idx"),
+            GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+            # For size/color filters and facets
+            GinIndex(fields=["size_values"], name="product_size_values_idx"),
+            GinIndex(fields=["color_values"], name="product_color_values_idx"),
+            # Serves both fuzzy (trigram) and icontains (UPPER LIKE) name searches
+            GinIndex(
+                OpClass(Upper("name"), name="gin_trgm_ops"),
+                name="product_name_trgm_idx",
+            ),
+        ]
+
 
 class Wishlist(BaseModel):
     """
@@ -354,6 +385,10 @@ class Order(IsDeletedModel):
                 fields=["user", "coupon"], name="unique_user_coupon_order"
             )
         ]
+        indexes = [
+            # Keyset pagination of the order listings (see `CustomPagination.cursor_ordering`)
+            models.Index(fields=["-created_at", "-id"], name="order_listing_idx"),
+        ]
 
 
 class OrderItem(BaseModel):
@@ -371,6 +406,8 @@ class OrderItem(BaseModel):
         unique constraints:
             unique_user_product_order_orderitems: Ensures that a user cannot have duplicate items with the same product, color, and size.
             unique_guest_product_order_orderitems: Ensures that a guest user cannot have duplicate items with the same product, color, and size.
+        indexes:
+            orderitem_listing_idx: Serves the keyset pagination of the cart items (see `CustomPagination.cursor_ordering`).
     """
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
@@ -443,6 +480,9 @@ class OrderItem(BaseModel):
                 name="unique_guest_product_orderitems",
             ),
         ]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="orderitem_listing_idx"),
+        ]
 
     def __str__(self):
         return str(self.product.name)
@@ -468,6 +508,9 @@ class Review(BaseModel):
     Meta:
         unique constraints:
             unique_user_product_reviews: Ensures that a user cannot review the same product more than once.
+        indexes:
+            review_product_rating_idx: Serves the reviews of a product sorted by rating (see `apps.shop.utils.REVIEW_SORT_ORDERINGS`).
+            review_product_created_idx: Serves them sorted by date (newest or oldest first).
     """
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reviews")
@@ -477,6 +520,13 @@ class Review(BaseModel):
     rating = models.IntegerField(choices=RATING_CHOICES)
     text = models.TextField()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Keep the stored rating so saves that don't change it skip the product's update
+        instance._loaded_rating = instance.__dict__.get("rating")
+        return instance
+
     def __str__(self):
         return f"{self.user.full_name}----{self.product.name}"
 
@@ -487,3 +537,13 @@ class Review(BaseModel):
                 name="unique_user_product_reviews",
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=["product", "rating", "created_at", "id"],
+                name="review_product_rating_idx",
+            ),
+            models.Index(
+                fields=["product", "created_at", "id"],
+                name="review_product_created_idx",
+            ),
+        ]
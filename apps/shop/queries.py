@@ -0,0 +1,118 @@
+"""
+The hot catalog reads in plain SQL, run with psycopg's async API (see apps.common.pg).
+
+They skip the ORM (its thread hop and query compilation) and return rows already
+shaped like the serializers' output. They're opt-in with DB_ASYNC_READS, and only
+cover the plain listing and detail queries: any other case returns None and the
+callers use their ORM path, which stays the reference for the output.
+"""
+
+from apps.accounts.models import User
+from apps.common.pg import afetchall, afetchone, async_reads_enabled
+from apps.sellers.models import Seller
+from apps.shop.models import Category, Product
+
+# The listing params the plain listing query handles
+PRODUCT_PAGE_PARAMS = {"per_page", "current_page"}
+
+PRODUCT_CARD_SQL = f"""
+    SELECT
+        p.id, p.name, p.slug, p."desc",
+        p.price_old::text AS price_old, p.price_current::text AS price_current,
+        p.size_values, p.color_values, p.reviews_count, p.avg_rating,
+        p.image1_url, p.image2_url, p.image3_url, p.related_ids,
+        s.id AS seller_id, s.business_name AS seller_name, s.slug AS seller_slug,
+        u.avatar_url AS seller_avatar,
+        c.name AS category_name, c.slug AS category_slug, c.image_url AS category_image
+    FROM {Product._meta.db_table} AS p
+    LEFT JOIN {Seller._meta.db_table} AS s ON s.id = p.seller_id
+    LEFT JOIN {User._meta.db_table} AS u ON u.id = s.user_id
+    JOIN {Category._meta.db_table} AS c ON c.id = p.category_id
+"""
+# Same as the default Product manager and the listings' in stock filter
+IN_STOCK_SQL = "p.is_deleted = false AND p.in_stock > 0"
+
+
+def product_card(row):
+    """
+    Shape a product row like `ProductSerializer` does.
+    """
+    seller = None
+    if row["seller_id"] is not None:
+        seller = {
+            "name": row["seller_name"],
+            "slug": row["seller_slug"],
+            "avatar": row["seller_avatar"],
+        }
+    return {
+        "seller": seller,
+        "name": row["name"],
+        "slug": row["slug"],
+        "desc": row["desc"],
+        "price_old": row["price_old"],
+        "price_current": row["price_current"],
+        "category": {
+            "name": row["category_name"],
+            "slug": row["category_slug"],
+            "image": row["category_image"],
+        },
+        "sizes": row["size_values"],
+        "colors": row["color_values"],
+        "reviews_count": row["reviews_count"],
+        "avg_rating": row["avg_rating"],
+        "wishlisted": False,
+        "image1": row["image1_url"],
+        "image2": row["image2_url"],
+        "image3": row["image3_url"],
+    }
+
+
+async def afetch_product_page(request, paginator, category_id=None):
+    """
+    Fetch a page of in-stock products, newest first, shaped like `ProductsResponseDataSerializer`.
+
+    Returns None when the fast path is off, or the request has filters it doesn't handle.
+    """
+    if not async_reads_enabled() or not PRODUCT_PAGE_PARAMS.issuperset(request.GET):
+        return None
+    where, params = IN_STOCK_SQL, []
+    if category_id:
+        where += " AND p.category_id = %s"
+        params.append(category_id)
+    count = await afetchone(
+        f"SELECT COUNT(*) AS count FROM {Product._meta.db_table} AS p WHERE {where}",
+        params,
+    )
+    page, bottom, top = paginator.get_page_bounds(request, count["count"])
+    rows = await afetchall(
+        f"{PRODUCT_CARD_SQL} WHERE {where} "
+        "ORDER BY p.created_at DESC, p.id DESC LIMIT %s OFFSET %s",
+        [*params, top - bottom, bottom],
+    )
+    return {**page, "products": [product_card(row) for row in rows]}
+
+
+async def afetch_product_detail(slug):
+    """
+    Fetch an in-stock product by slug, with its related products (see
+    `fetch_related_products`), shaped like `ProductSerializer`.
+
+    Returns a (product row, data) tuple, the row carrying the id and reviews count
+    its reviews are fetched with, or None for an unknown product. Callers check
+    `async_reads_enabled` first.
+    """
+    row = await afetchone(
+        f"{PRODUCT_CARD_SQL} WHERE {IN_STOCK_SQL} AND p.slug = %s", [slug]
+    )
+    if not row:
+        return None
+    data = product_card(row)
+    related = []
+    if row["related_ids"]:
+        related = await afetchall(
+            f"{PRODUCT_CARD_SQL} WHERE {IN_STOCK_SQL} AND p.id = ANY(%s) "
+            "ORDER BY array_position(%s, p.id)",
+            [row["related_ids"], row["related_ids"]],
+        )
+    data["related_products"] = [product_card(related_row) for related_row in related]
+    return row, data
@@ -12,9 +12,11 @@ from apps.common.exceptions import ErrorCode
 from apps.common.schema_examples import (
     DATETIME_EXAMPLE,
     ERR_RESPONSE_STATUS,
+    GUEST_ID_EXAMPLE,
     PAGINATED_RESPONSE_EXAMPLE,
     RESPONSE_TYPE,
     SUCCESS_RESPONSE_STATUS,
+    UNPROCESSABLE_ENTITY_EXAMPLE,
     UUID_EXAMPLE,
     non_existent_response_example,
     page_parameter_example,
@@ -156,6 +158,36 @@ REVIEW_RESPONSE_EXAMPLE = {
     401: UNAUTHORIZED_USER_RESPONSE,
 }
 
+PRODUCT_REVIEWS_RESPONSE = {
+    200: OpenApiResponse(
+        response=RESPONSE_TYPE,
+        description="Product Reviews Fetched",
+        examples=[
+            OpenApiExample(
+                name="Success Response",
+                value={
+                    "status": SUCCESS_RESPONSE_STATUS,
+                    "message": "Product Reviews Fetched Successfully",
+                    "data": PAGINATED_RESPONSE_EXAMPLE | {"items": [REVIEW_EXAMPLE]},
+                },
+            )
+        ],
+    ),
+    404: PRODUCT_NON_EXISTENT_RESPONSE,
+    401: UNAUTHORIZED_USER_OR_GUEST_RESPONSE,
+    422: UNPROCESSABLE_ENTITY_EXAMPLE,
+}
+
+PRODUCT_REVIEWS_PARAM_EXAMPLE = [
+    OpenApiParameter(
+        name="sort",
+        description="Order of the reviews: highest (rating, the default), lowest, newest or oldest. The order is kept in cursor mode",
+        required=False,
+        type=OpenApiTypes.STR,
+        enum=["highest", "lowest", "newest", "oldest"],
+    ),
+    *page_parameter_example("reviews", 100),
+]
 
 PRODUCTS_PARAM_EXAMPLE = [
     OpenApiParameter(
@@ -164,6 +196,18 @@ PRODUCTS_PARAM_EXAMPLE = [
         required=False,
         type=OpenApiTypes.STR,
     ),
+    OpenApiParameter(
+        name="fuzzy",
+        description="Set to true to match the name filter against product and seller names with typo tolerance. Results are ordered by similarity",
+        required=False,
+        type=OpenApiTypes.BOOL,
+    ),
+    OpenApiParameter(
+        name="search",
+        description="Full-text search products by name, category and description. Supports quoted phrases, 'or' and '-' exclusions. Results are ordered by relevance",
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
     OpenApiParameter(
         name="size",
         type=OpenApiTypes.STR,
@@ -178,6 +222,12 @@ PRODUCTS_PARAM_EXAMPLE = [
         required=False,
         explode=True,
     ),
+    OpenApiParameter(
+        name="facets",
+        description="Set to true to also return the number of matching products per size, color and category (slug)",
+        required=False,
+        type=OpenApiTypes.BOOL,
+    ),
     *page_parameter_example("products", 100),
 ]
 
@@ -191,7 +241,7 @@ WISHLIST_RESPONSE_EXAMPLE = {
                 value={
                     "status": SUCCESS_RESPONSE_STATUS,
                     "message": "Product Added To Wishlist Successfully",
-                    "guest_id": UUID_EXAMPLE,  # Optional
+                    "guest_id": GUEST_ID_EXAMPLE,  # Optional
                 },
             )
         ],
@@ -205,7 +255,7 @@ WISHLIST_RESPONSE_EXAMPLE = {
                 value={
                     "status": SUCCESS_RESPONSE_STATUS,
                     "message": "Product Removed From Wishlist Successfully",
-                    "guest_id": UUID_EXAMPLE,  # Optional
+                    "guest_id": GUEST_ID_EXAMPLE,  # Optional
                 },
             )
         ],
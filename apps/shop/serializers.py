@@ -43,18 +43,19 @@ class ProductSerializer(serializers.Serializer):
     image3 = serializers.CharField(source="image3_url")
 
     def get_sizes(self, obj: Product):
-        sizes = obj.sizes_ if hasattr(obj, "sizes_") and obj.sizes_ else obj.sizes.all()
-        return [size.value for size in sizes]
+        if hasattr(obj, "sizes_") and obj.sizes_:
+            return [size.value for size in obj.sizes_]
+        return obj.size_values
 
     def get_colors(self, obj: Product):
-        colors = (
-            obj.colors_ if hasattr(obj, "colors_") and obj.colors_ else obj.colors.all()
-        )
-        return [color.value for color in colors]
+        if hasattr(obj, "colors_") and obj.colors_:
+            return [color.value for color in obj.colors_]
+        return obj.color_values
 
 
 class ProductsResponseDataSerializer(PaginatedResponseDataSerializer):
     products = ProductSerializer(many=True, source="items")
+    facets = serializers.DictField(required=False)
 
 
 class ReviewSerializer(serializers.Serializer):
@@ -0,0 +1,179 @@
+from django.db.models import F, Func, Value
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts.models import User
+from apps.shop.models import (
+    Category,
+    Color,
+    Country,
+    Product,
+    Review,
+    Size,
+    Wishlist,
+)
+from apps.sellers.models import Seller
+from apps.shop.utils import (
+    category_registry,
+    color_registry,
+    country_registry,
+    product_listing_cache,
+    rebuild_product_ratings,
+    size_registry,
+    wishlist_cache,
+    update_product_related_ids,
+    update_product_search_vectors,
+    update_product_size_color_values,
+)
+
+SEARCH_VECTOR_FIELDS = {"name", "desc", "category", "category_id"}
+RELATED_IDS_FIELDS = {"category", "category_id"}
+
+
+@receiver(post_save, sender=Review)
+def update_product_rating_on_review_save(sender, instance, created, **kwargs):
+    """
+    Recompute the product's reviews_count and avg_rating from its reviews.
+
+    A single UPDATE with aggregate subqueries is used, so concurrent reviews of the
+    same product don't overwrite each other (nor drift like an incremental average),
+    and it runs in the caller's transaction.
+    """
+    if created or getattr(instance, "_loaded_rating", None) != instance.rating:
+        rebuild_product_ratings(
+            Product.objects.unfiltered().filter(id=instance.product_id)
+        )
+    instance._loaded_rating = instance.rating
+
+
+@receiver(post_delete, sender=Review)
+def update_product_rating_on_review_delete(sender, instance, **kwargs):
+    rebuild_product_ratings(Product.objects.unfiltered().filter(id=instance.product_id))
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_vector_on_product_save(
+    sender, instance, update_fields, **kwargs
+):
+    if update_fields and not SEARCH_VECTOR_FIELDS.intersection(update_fields):
+        return
+    update_product_search_vectors(Product.objects.unfiltered().filter(id=instance.id))
+
+
+@receiver(post_save, sender=Product)
+def update_product_related_ids_on_product_save(
+    sender, instance, created, update_fields, **kwargs
+):
+    # Only the product's own list is refreshed here, the lists it should now appear in
+    # (or in which it's out of stock) are caught up by `refresh_related_products`
+    if update_fields and not RELATED_IDS_FIELDS.intersection(update_fields):
+        return
+    update_product_related_ids(Product.objects.unfiltered().filter(id=instance.id))
+
+
+@receiver(post_save, sender=Category)
+def update_product_search_vector_on_category_save(sender, instance, created, **kwargs):
+    if created or getattr(instance, "_loaded_name", None) == instance.name:
+        return
+    update_product_search_vectors(
+        Product.objects.unfiltered().filter(category_id=instance.id)
+    )
+    instance._loaded_name = instance.name
+
+
+@receiver(m2m_changed, sender=Product.sizes.through)
+@receiver(m2m_changed, sender=Product.colors.through)
+def update_product_size_color_values_on_m2m_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    # reverse means the change was made from the size/color side (e.g size.products.add())
+    if action == "pre_clear" and reverse:
+        # The cleared products can't be known afterwards
+        instance._cleared_product_ids = list(
+            instance.products.values_list("id", flat=True)
+        )
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        product_ids = [instance.id]
+    elif action == "post_clear":
+        product_ids = instance.__dict__.pop("_cleared_product_ids", [])
+    else:
+        product_ids = pk_set
+    update_product_size_color_values(
+        Product.objects.unfiltered().filter(id__in=product_ids)
+    )
+
+
+@receiver(post_save, sender=Size)
+@receiver(post_save, sender=Color)
+def update_product_size_color_values_on_value_save(sender, instance, created, **kwargs):
+    if not created:
+        update_product_size_color_values(
+            Product.objects.unfiltered().filter(
+                **{f"{sender._meta.model_name}s": instance}
+            )
+        )
+
+
+@receiver(post_delete, sender=Size)
+@receiver(post_delete, sender=Color)
+def update_product_size_color_values_on_value_delete(sender, instance, **kwargs):
+    field = f"{sender._meta.model_name}_values"
+    Product.objects.unfiltered().filter(
+        **{f"{field}__contains": [instance.value]}
+    ).update(**{field: Func(F(field), Value(instance.value), function="array_remove")})
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Size)
+@receiver(post_delete, sender=Size)
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+@receiver(post_save, sender=Seller)
+@receiver(post_delete, sender=Seller)
+@receiver(m2m_changed, sender=Product.sizes.through)
+@receiver(m2m_changed, sender=Product.colors.through)
+def invalidate_product_listing_cache(sender, **kwargs):
+    product_listing_cache.invalidate()
+
+
+@receiver(post_save, sender=User)
+def invalidate_product_listing_cache_on_profile_change(
+    sender, instance, created, **kwargs
+):
+    # Sellers and reviewers are shown with their names and avatars
+    profile = instance.public_profile()
+    if not created and getattr(instance, "_loaded_profile", None) != profile:
+        product_listing_cache.invalidate()
+    instance._loaded_profile = profile
+
+
+@receiver(post_save, sender=Wishlist)
+@receiver(post_delete, sender=Wishlist)
+def invalidate_wishlist_cache(sender, instance, **kwargs):
+    wishlist_cache(instance.user_id or instance.guest_id).invalidate()
+
+
+@receiver(post_save, sender=Size)
+@receiver(post_delete, sender=Size)
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+@receiver(post_save, sender=Country)
+@receiver(post_delete, sender=Country)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_reference_registry(sender, **kwargs):
+    registries = {
+        Size: size_registry,
+        Color: color_registry,
+        Country: country_registry,
+        Category: category_registry,
+    }
+    registries[sender].invalidate()
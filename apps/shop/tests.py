@@ -1,9 +1,45 @@
+import tempfile
 from unittest import mock
-from rest_framework.test import APITestCase
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APITransactionTestCase
 
+from apps.accounts.models import GuestUser
 from apps.accounts.test_utils import TestAccountUtil
+from apps.common import executors
 from apps.common.exceptions import ErrorCode
+from apps.common.paginators import CustomPagination
+from apps.common.pg import aclose_pool
+from apps.common.renderers import ORJSONGuestIDRenderer
+from apps.common.serializers import compile_serializer
+from apps.shop.models import (
+    Category,
+    Color,
+    Order,
+    OrderItem,
+    Product,
+    Review,
+    Size,
+    Wishlist,
+)
+from apps.shop.queries import afetch_product_detail, afetch_product_page
+from apps.shop.serializers import (
+    OrderItemsResponseDataSerializer,
+    ProductDetailSerializer,
+    ProductSerializer,
+    ProductsResponseDataSerializer,
+)
 from apps.shop.test_utils import TestShopUtil
+from apps.shop.utils import (
+    fetch_product_cards,
+    fetch_products,
+    product_listing_cache,
+    size_registry,
+)
 
 
 class TestShop(APITestCase):
@@ -66,6 +102,274 @@ class TestShop(APITestCase):
             },
         )
 
+        # Test for invalid page
+        response = self.client.get(f"{self.products_url}?current_page=2")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(
+            response.json(),
+            {
+                "status": "failure",
+                "code": ErrorCode.INVALID_PAGE,
+                "message": "Invalid Page",
+                "guest_id": mock.ANY,
+            },
+        )
+
+    @mock.patch("apps.common.cache.COUNTS_FLUSH_INTERVAL", 3600)
+    def test_products_fetch_cache(self):
+        product = self.product
+        async_to_sync(product_listing_cache.aflush_counts)()
+        before = product_listing_cache.stats()
+        response = self.client.get(self.products_url, **self.bearer)
+        self.assertEqual(response["X-Cache"], "MISS")
+
+        # Test for cached page with the personal wishlisted flag
+        Wishlist.objects.create(user=self.user, product=product)
+        response = self.client.get(self.products_url, **self.bearer)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertTrue(response.json()["data"]["products"][0]["wishlisted"])
+        response = self.client.get(self.products_url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertFalse(response.json()["data"]["products"][0]["wishlisted"])
+
+        # Test for invalidation on product change
+        product.name = "Renamed Product"
+        product.save()
+        response = self.client.get(self.products_url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(
+            response.json()["data"]["products"][0]["name"], "Renamed Product"
+        )
+
+        # Test for the counters, added to the shared ones in batches
+        self.assertEqual(product_listing_cache.stats(), before)
+        async_to_sync(product_listing_cache.aflush_counts)()
+        stats = product_listing_cache.stats()
+        self.assertEqual(stats["hits"] - before["hits"], 2)
+        self.assertEqual(stats["misses"] - before["misses"], 2)
+
+        # Test for the command, only reading a shared cache
+        with self.assertRaises(CommandError):
+            call_command("listing_cache_stats")
+        with mock.patch(
+            "apps.shop.management.commands.listing_cache_stats.cache_is_shared",
+            return_value=True,
+        ):
+            call_command("listing_cache_stats")
+
+    def test_products_fetch_conditional(self):
+        product = self.product
+        response = self.client.get(self.products_url, **self.bearer)
+        etag = response["ETag"]
+        self.assertEqual(response.status_code, 200)
+
+        # Test for unchanged products
+        response = self.client.get(
+            self.products_url, HTTP_IF_NONE_MATCH=etag, **self.bearer
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+        # Test for a guest's wishlist change (a guest of a signed id is never loaded)
+        guest_id = self.client.get(self.products_url).json()["guest_id"]
+        headers = {"HTTP_GUEST_USER_ID": guest_id}
+        toggle_url = f"{self.wishlist_url}{product.slug}/"
+        self.client.get(toggle_url, **headers)
+        response = self.client.get(self.products_url, **headers)
+        self.assertTrue(response.json()["data"]["products"][0]["wishlisted"])
+        guest_etag = response["ETag"]
+        self.client.get(toggle_url, **headers)
+        response = self.client.get(
+            self.products_url, HTTP_IF_NONE_MATCH=guest_etag, **headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["data"]["products"][0]["wishlisted"])
+
+        # Test for a change of the user's wishlist
+        Wishlist.objects.create(user=self.user, product=product)
+        response = self.client.get(
+            self.products_url, HTTP_IF_NONE_MATCH=etag, **self.bearer
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["data"]["products"][0]["wishlisted"])
+        etag = response["ETag"]
+
+        # Test for a change of a product
+        product.name = "Renamed Product"
+        product.save()
+        response = self.client.get(
+            self.products_url, HTTP_IF_NONE_MATCH=etag, **self.bearer
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # Test for the details and categories
+        for url in (f"{self.products_url}{product.slug}/", self.product_categories_url):
+            response = self.client.get(url, **self.bearer)
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response["ETag"], **self.bearer
+            )
+            self.assertEqual(response.status_code, 304)
+
+    def test_products_fetch_with_cursor(self):
+        product = self.product
+        newer_product = Product.objects.create(
+            seller=product.seller,
+            name="Newer Product",
+            desc=product.desc,
+            price_old=product.price_old,
+            price_current=product.price_current,
+            category=product.category,
+        )
+
+        # Test for first page
+        response = self.client.get(f"{self.products_url}?cursor=&per_page=1")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(
+            data,
+            {
+                "per_page": 1,
+                "next_cursor": mock.ANY,
+                "products": [TestShopUtil.product_data(newer_product)],
+            },
+        )
+
+        # Test for last page, fetched with a row comparison
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                f"{self.products_url}?cursor={data['next_cursor']}&per_page=1"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            any(
+                '("shop_product"."created_at", "shop_product"."id") <' in query["sql"]
+                for query in queries
+            )
+        )
+        self.assertEqual(
+            response.json()["data"],
+            {
+                "per_page": 1,
+                "next_cursor": None,
+                "products": [TestShopUtil.product_data(product)],
+            },
+        )
+
+        # Test for invalid cursors
+        invalid_values = CustomPagination().encode_cursor(
+            {"created_at": "yesterday", "id": "x"}, ("-created_at", "-id")
+        )
+        for cursor in ("invalid", invalid_values):
+            response = self.client.get(f"{self.products_url}?cursor={cursor}")
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(
+                response.json(),
+                {
+                    "status": "failure",
+                    "code": ErrorCode.INVALID_PAGE,
+                    "message": "Invalid Cursor",
+                    "guest_id": mock.ANY,
+                },
+            )
+
+    def test_products_search(self):
+        product = self.product
+        shoes = Product.objects.create(
+            seller=product.seller,
+            name="Blue Running Shoes",
+            desc="Light shoes for long runs",
+            price_old=product.price_old,
+            price_current=product.price_current,
+            category=product.category,
+        )
+
+        # Test for search matches and exclusions
+        response = self.client.get(f"{self.products_url}?search=shoes")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["data"]["products"], [TestShopUtil.product_data(shoes)]
+        )
+        response = self.client.get(f"{self.products_url}?search=good -shoes")
+        self.assertEqual(
+            response.json()["data"]["products"], [TestShopUtil.product_data(product)]
+        )
+
+        # Test for search after a category rename
+        category = self.category
+        category.name = "Footwear"
+        category.save()
+        response = self.client.get(f"{self.products_url}?search=footwear")
+        self.assertEqual(len(response.json()["data"]["products"]), 2)
+
+    def test_products_fuzzy_search(self):
+        product = self.product
+
+        # Test for misspelt product name
+        response = self.client.get(f"{self.products_url}?name=prodcut&fuzzy=true")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["data"]["products"], [TestShopUtil.product_data(product)]
+        )
+        response = self.client.get(f"{self.products_url}?name=prodcut")
+        self.assertEqual(response.json()["data"]["products"], [])
+
+        # Test for misspelt seller name
+        response = self.client.get(f"{self.products_url}?name=venturs&fuzzy=true")
+        self.assertEqual(
+            response.json()["data"]["products"], [TestShopUtil.product_data(product)]
+        )
+
+        # Test for unrelated name
+        response = self.client.get(f"{self.products_url}?name=xylophone&fuzzy=true")
+        self.assertEqual(response.json()["data"]["products"], [])
+
+    def test_products_size_color_filter_and_facets(self):
+        product = self.product
+        other_product = Product.objects.create(
+            seller=product.seller,
+            name="Other Product",
+            desc=product.desc,
+            price_old=product.price_old,
+            price_current=product.price_current,
+            category=product.category,
+        )
+        xl, s = Size.objects.create(value="XL"), Size.objects.create(value="S")
+        red = Color.objects.create(value="Red")
+        product.sizes.add(xl)
+        other_product.sizes.add(s)
+        red.products.add(other_product)
+
+        # Test for size filter
+        response = self.client.get(f"{self.products_url}?size=XL")
+        self.assertEqual(
+            response.json()["data"]["products"], [TestShopUtil.product_data(product)]
+        )
+
+        # Test for size or color filter with facets
+        response = self.client.get(f"{self.products_url}?size=XL&color=Red&facets=true")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(len(data["products"]), 2)
+        self.assertEqual(data["last_page"], 1)
+        self.assertEqual(
+            data["facets"],
+            {
+                "sizes": {"XL": 1, "S": 1},
+                "colors": {"Red": 1},
+                "categories": {product.category.slug: 2},
+            },
+        )
+
+        # Test for renamed and deleted sizes/colors
+        xl.value = "XXL"
+        xl.save()
+        red.delete()
+        response = self.client.get(f"{self.products_url}?size=XXL&color=Red")
+        self.assertEqual(
+            response.json()["data"]["products"], [TestShopUtil.product_data(product)]
+        )
+
     def check_product_not_found_error(self, response, guest=True):
         self.assertEqual(response.status_code, 404)
         expected_data = {
@@ -97,6 +401,101 @@ class TestShop(APITestCase):
                 | {"reviews": mock.ANY, "related_products": mock.ANY},
             },
         )
+        self.assertFalse(response.json()["data"]["wishlisted"])
+
+        # Test for wishlisted flag of the user
+        TestShopUtil.wishlist()
+        response = self.client.get(f"{self.products_url}{product.slug}/", **self.bearer)
+        self.assertTrue(response.json()["data"]["wishlisted"])
+
+    def test_product_related_products(self):
+        product = self.product
+        product_data = {
+            "seller": product.seller,
+            "desc": "Another product",
+            "price_old": 1000.25,
+            "price_current": 900.25,
+            "category": product.category,
+        }
+        rated = Product.objects.create(name="Rated Product", **product_data)
+        bought = Product.objects.create(name="Bought Product", **product_data)
+        out_of_stock = Product.objects.create(
+            name="Out Of Stock Product", in_stock=0, **product_data
+        )
+        Review.objects.create(user=self.user, product=rated, rating=5, text="Good")
+
+        # Test for the list of a new product, computed on save
+        bought.refresh_from_db()
+        self.assertCountEqual(bought.related_ids, [product.id, rated.id])
+
+        # Test for ranking by co-purchases, then rating
+        order = Order.objects.create(user=self.user, payment_status="SUCCESSFUL")
+        OrderItem.objects.create(user=self.user, order=order, product=product)
+        OrderItem.objects.create(user=self.user, order=order, product=bought)
+        call_command("refresh_related_products", batch_size=2)
+        response = self.client.get(f"{self.products_url}{product.slug}/")
+        self.assertEqual(response.status_code, 200)
+        related_products = response.json()["data"]["related_products"]
+        self.assertEqual(
+            [related["slug"] for related in related_products],
+            [bought.slug, rated.slug],
+        )
+        self.assertNotIn(
+            out_of_stock.id, Product.objects.get(id=product.id).related_ids
+        )
+
+        # Test for related products gone out of stock since the refresh
+        Product.objects.filter(id=bought.id).update(in_stock=0)
+        response = self.client.get(f"{self.products_url}{product.slug}/")
+        related_products = response.json()["data"]["related_products"]
+        self.assertEqual(
+            [related["slug"] for related in related_products], [rated.slug]
+        )
+
+    def test_product_reviews_fetch(self):
+        product = self.product
+        reviews_url = f"{self.products_url}{product.slug}/reviews/"
+        low = Review.objects.create(
+            user=self.user, product=product, rating=2, text="Bad"
+        )
+        high = Review.objects.create(
+            user=TestAccountUtil.another_user(), product=product, rating=5, text="Good"
+        )
+
+        # Test for Product not found
+        response = self.client.get(f"{self.products_url}invalid_slug/reviews/")
+        self.check_product_not_found_error(response)
+
+        # Test for invalid sort
+        response = self.client.get(f"{reviews_url}?sort=random")
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()["code"], ErrorCode.INVALID_ENTRY)
+
+        # Test for default sort (highest rating first)
+        response = self.client.get(reviews_url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual(
+            [item["text"] for item in data["items"]], [high.text, low.text]
+        )
+        self.assertEqual(data["last_page"], 1)
+
+        # Test for sorted cursor pages
+        response = self.client.get(f"{reviews_url}?sort=lowest&cursor=&per_page=1")
+        data = response.json()["data"]
+        self.assertEqual([item["text"] for item in data["items"]], [low.text])
+        response = self.client.get(
+            f"{reviews_url}?sort=lowest&cursor={data['next_cursor']}&per_page=1"
+        )
+        data = response.json()["data"]
+        self.assertEqual([item["text"] for item in data["items"]], [high.text])
+        self.assertIsNone(data["next_cursor"])
+
+        # Test for an out of stock product, not found like its details
+        product.in_stock = 0
+        product.save()
+        response = self.client.get(reviews_url)
+        self.check_product_not_found_error(response)
 
     def test_write_review(self):
         review_data = {"rating": 5, "text": "This is a good product"}
@@ -125,6 +524,162 @@ class TestShop(APITestCase):
                 },
             },
         )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reviews_count, 1)
+        self.assertEqual(self.product.avg_rating, 5)
+
+        # Test for update
+        other_user = TestAccountUtil.another_user()
+        Review.objects.create(
+            user=other_user, product=self.product, rating=2, text="Meh"
+        )
+        response = self.client.post(
+            f"{self.products_url}{self.product.slug}/",
+            {"rating": 3, "text": "Not that good"},
+            **self.bearer,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reviews_count, 2)
+        self.assertEqual(self.product.avg_rating, 2.5)
+
+        # Test for delete and rebuild
+        Review.objects.get(user=other_user).delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reviews_count, 1)
+        self.assertEqual(self.product.avg_rating, 3)
+
+        Product.objects.filter(id=self.product.id).update(reviews_count=0, avg_rating=0)
+        call_command("rebuild_product_ratings", batch_size=1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reviews_count, 1)
+        self.assertEqual(self.product.avg_rating, 3)
+
+        # Test that the average is recomputed exactly, not adjusted from a drifted one
+        Product.objects.filter(id=self.product.id).update(
+            reviews_count=5, avg_rating=2.9999999
+        )
+        Review.objects.create(
+            user=other_user, product=self.product, rating=4, text="Fine"
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reviews_count, 2)
+        self.assertEqual(self.product.avg_rating, 3.5)
+
+    def test_image_urls_stored(self):
+        storages = {
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+            },
+        }
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            STORAGES=storages, MEDIA_ROOT=media_root, MEDIA_URL="/media/"
+        ):
+            category = Category.objects.create(
+                name="Image Category",
+                image=SimpleUploadedFile("category.png", b"image"),
+            )
+            product = self.product
+            product.image1 = SimpleUploadedFile("product.png", b"image")
+            product.save()
+
+            # Test for URLs resolved on save, once the file is uploaded
+            category.refresh_from_db()
+            self.assertEqual(category.image_url, f"/media/{category.image.name}")
+            product.refresh_from_db()
+            self.assertEqual(product.image1_url, f"/media/{product.image1.name}")
+            self.assertIsNone(product.image2_url)
+
+        # Test for the social avatar of users without an avatar
+        self.assertEqual(self.user.avatar_url, self.user.social_avatar)
+
+    def test_compiled_serializers(self):
+        product = Product.objects.select_related(
+            "category", "seller", "seller__user"
+        ).get(id=self.product.id)
+        size = Size.objects.create(value="XL")
+        product.sizes.add(size)
+        product.refresh_from_db(fields=["size_values"])
+        product.wishlisted = True
+
+        # Test for products, with and without unset attributes
+        self.assertEqual(
+            compile_serializer(ProductSerializer)(product),
+            ProductSerializer(product).data,
+        )
+        product.sizes_ = [size]
+        del product.wishlisted
+        self.assertEqual(
+            compile_serializer(ProductSerializer)(product),
+            ProductSerializer(product).data,
+        )
+        product.related_products = [product]
+        product.reviews_data = {"items": [], "per_page": 100, "next_cursor": None}
+        self.assertEqual(
+            compile_serializer(ProductDetailSerializer)(product),
+            ProductDetailSerializer(product).data,
+        )
+
+        # Test for pages, with optional keys left out or present
+        pages = (
+            {"items": [product], "per_page": 100, "current_page": 1, "last_page": 1},
+            {"items": [], "per_page": 1, "next_cursor": None, "facets": {"XL": 1}},
+        )
+        for page in pages:
+            self.assertEqual(
+                compile_serializer(ProductsResponseDataSerializer)(page),
+                ProductsResponseDataSerializer(page).data,
+            )
+
+        # Test for order items, with null size and color
+        page = {"items": [self.orderitem], "per_page": 100, "next_cursor": "abc"}
+        self.assertEqual(
+            compile_serializer(OrderItemsResponseDataSerializer)(page),
+            OrderItemsResponseDataSerializer(page).data,
+        )
+
+    def test_product_cards_match_orm(self):
+        # A product without seller nor old price, with a fractional rating
+        Product.objects.create(
+            category=self.category,
+            name="Sellerless Product",
+            desc="A good product without seller",
+            price_old=None,
+            price_current=1000.5,
+            size_values=["S", "XL"],
+            color_values=["Red"],
+            reviews_count=3,
+            avg_rating=4.333333333333333,
+        )
+        Product.objects.filter(id=self.product.id).update(reviews_count=1, avg_rating=4)
+        paginator = CustomPagination()
+        renderer = ORJSONGuestIDRenderer()
+        params = (
+            {},
+            {"per_page": 1, "current_page": 2},
+            {"per_page": 1, "cursor": ""},
+            {"name": "product", "fuzzy": "true", "facets": "true"},
+            {"search": "good", "size": "XL"},
+        )
+        for param in params:
+            request = RequestFactory().get("/", param)
+            cards = async_to_sync(fetch_product_cards)(request, paginator)
+            # The ORM path is the reference, to the byte
+            orm_data = compile_serializer(ProductsResponseDataSerializer)(
+                async_to_sync(fetch_products)(request, paginator)
+            )
+            self.assertEqual(renderer.render(cards), renderer.render(orm_data))
+
+        # Test for the next cursor of a page of cards
+        request = RequestFactory().get("/", {"per_page": 1, "cursor": ""})
+        next_cursor = async_to_sync(fetch_product_cards)(request, paginator)[
+            "next_cursor"
+        ]
+        request = RequestFactory().get("/", {"per_page": 1, "cursor": next_cursor})
+        cards = async_to_sync(fetch_product_cards)(request, paginator)
+        self.assertEqual(cards["products"][0]["slug"], self.product.slug)
+        self.assertIsNone(cards["next_cursor"])
 
     def test_wishlist_fetch(self):
         wishlist = TestShopUtil.wishlist()
@@ -162,6 +717,29 @@ class TestShop(APITestCase):
             },
         )
 
+    def test_guest_materialized_on_first_write(self):
+        # Browsing issues a signed guest id without creating the guest
+        response = self.client.get(self.products_url)
+        guest_id = response.json()["guest_id"]
+        self.assertFalse(GuestUser.objects.exists())
+        response = self.client.get(self.products_url, HTTP_GUEST_USER_ID=guest_id)
+        self.assertEqual(response.json()["guest_id"], guest_id)
+
+        # A tampered id isn't trusted
+        response = self.client.get(
+            self.products_url, HTTP_GUEST_USER_ID=f"{guest_id.split(':')[0]}:bad"
+        )
+        self.assertNotEqual(response.json()["guest_id"], guest_id)
+
+        # The first write creates it
+        response = self.client.get(
+            f"{self.wishlist_url}{self.product.slug}/", HTTP_GUEST_USER_ID=guest_id
+        )
+        self.assertEqual(response.status_code, 201)
+        guest = GuestUser.objects.get()
+        self.assertEqual(guest.signed_id, guest_id)
+        self.assertTrue(Wishlist.objects.filter(guest=guest).exists())
+
     def test_products_fetch_by_category(self):
         product = self.product
         # Check for error response for invalid category slug
@@ -237,6 +815,31 @@ class TestShop(APITestCase):
             ["Item Added To Cart", "Item Updated In Cart", "Item Removed From Cart"],
         )
 
+    def test_toggle_cart_size(self):
+        product = self.product
+        Product.objects.filter(id=product.id).update(size_values=["XL", "XXL"])
+        size_registry.load()
+        # Created without invalidating the registry (like by another worker)
+        Size.objects.bulk_create([Size(value="XL")])
+
+        # A size of the product missing from the registry reloads it
+        response = self.client.post(
+            self.cart_url,
+            {"slug": product.slug, "quantity": 1, "size": "XL"},
+            **self.bearer,
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["data"]["size"], "XL")
+
+        # Still missing once reloaded, it's not stored as no size
+        response = self.client.post(
+            self.cart_url,
+            {"slug": product.slug, "quantity": 1, "size": "XXL"},
+            **self.bearer,
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()["data"], {"size": "Invalid size selected"})
+
     def test_checkout(self):
         data = {
             "shipping": {
@@ -258,3 +861,88 @@ class TestShop(APITestCase):
         response_json = response.json()
         self.assertEqual(response_json["status"], "success")
         self.assertEqual(response_json["message"], "Checkout Successful")
+
+
+class TestShopReadExecutor(APITransactionTestCase):
+    # The executor threads' connections only see committed data
+    products_url = TestShop.products_url
+    cart_url = TestShop.cart_url
+
+    def setUp(self):
+        self.user = TestAccountUtil.new_user()
+        self.product = TestShopUtil.product()
+        self.orderitem = TestShopUtil.orderitem()
+        auth_token = TestAccountUtil.auth_token(self.user)
+        self.bearer = {"HTTP_AUTHORIZATION": f"Bearer {auth_token}"}
+        self.run_read = mock.patch.object(
+            executors, "_run_read", wraps=executors._run_read
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+    @override_settings(DB_READ_EXECUTOR_THREADS=2)
+    def test_products_fetch(self):
+        response = self.client.get(self.products_url, **self.bearer)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["data"]["products"],
+            [TestShopUtil.product_data(self.product) | {"wishlisted": False}],
+        )
+        self.assertTrue(self.run_read.called)
+
+    @override_settings(DB_READ_EXECUTOR_THREADS=2)
+    def test_cart_view(self):
+        response = self.client.get(self.cart_url, **self.bearer)
+        self.assertEqual(response.status_code, 200)
+        items = response.json()["data"]["items"]
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0]["product"]["slug"], self.product.slug)
+        self.assertTrue(self.run_read.called)
+
+
+class TestAsyncReads(TransactionTestCase):
+    # The pool's connections only see committed data
+
+    def test_async_reads_match_orm(self):
+        product = TestShopUtil.product()
+        related = Product.objects.create(
+            seller=product.seller,
+            category=product.category,
+            name="Related Product",
+            desc="Another good product",
+            price_old=None,
+            price_current=100,
+            size_values=["S"],
+        )
+        Product.objects.filter(id=product.id).update(related_ids=[related.id])
+        request = RequestFactory().get("/", {"per_page": 1, "current_page": 2})
+        paginator = CustomPagination()
+
+        async def fetch():
+            try:
+                with override_settings(DB_ASYNC_READS=True):
+                    page = await afetch_product_page(request, paginator)
+                    _, detail = await afetch_product_detail(product.slug)
+                    filtered = await afetch_product_page(
+                        RequestFactory().get("/", {"name": "good"}), paginator
+                    )
+            finally:
+                await aclose_pool()
+            return page, detail, filtered
+
+        page, detail, filtered = async_to_sync(fetch)()
+        # The ORM path is the reference
+        orm_page = compile_serializer(ProductsResponseDataSerializer)(
+            async_to_sync(fetch_products)(request, paginator)
+        )
+        self.assertEqual(page, orm_page)
+        self.assertEqual(
+            detail,
+            compile_serializer(ProductSerializer)(product)
+            | {
+                "related_products": compile_serializer(ProductSerializer).many(
+                    [related]
+                )
+            },
+        )
+        # Filtered listings are left to the ORM
+        self.assertIsNone(filtered)
@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path("products/", views.ProductsView.as_view()),
     path("products/<slug:slug>/", views.ProductView.as_view()),
+    path("products/<slug:slug>/reviews/", views.ProductReviewsView.as_view()),
     path("categories/", views.CategoriesView.as_view()),
     path("categories/<slug:slug>/", views.ProductsByCategoryView.as_view()),
     path("wishlist/", views.WishlistView.as_view()),
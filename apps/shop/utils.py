@@ -2,54 +2,512 @@ import json
 from typing import Dict, List
 
 from django.conf import settings
-import requests
-from apps.shop.models import Order, OrderItem, Product, ShippingAddress
-from asgiref.sync import sync_to_async
-from apps.common.utils import REVIEWS_AND_RATING_WISHLISTED_CARTED_ANNOTATION
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import (
+    Avg,
+    Case,
+    CharField,
+    Count,
+    F,
+    FloatField,
+    Func,
+    JSONField,
+    OuterRef,
+    Q,
+    Subquery,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, Upper
+from django.utils import timezone
+import orjson, requests
+from apps.sellers.models import Seller
+from apps.shop.models import (
+    SEARCH_CONFIG,
+    Category,
+    Color,
+    Country,
+    Order,
+    OrderItem,
+    Product,
+    Review,
+    ShippingAddress,
+    Size,
+    Wishlist,
+)
+from apps.common.cache import VersionedCache, make_etag
+from apps.common.executors import alist, aread
+from apps.common.registry import ReferenceRegistry
+from apps.common.serializers import PaginatedResponseDataSerializer, compile_serializer
 
+# The non personal (wishlisted excluded) serialized pages of the product listings
+product_listing_cache = VersionedCache("listings", settings.LISTING_CACHE_TIMEOUT)
+LISTING_CACHE_PARAMS = (
+    "name",
+    "fuzzy",
+    "search",
+    "size",
+    "color",
+    "facets",
+    "per_page",
+    "current_page",
+    "cursor",
+)
 
-def color_size_filter_products(products_original, sizes, colors):
-    products = products_original
-    sized_products = None
-    colored_products = None
 
-    if len(sizes) > 0:
-        sized_products = products_original.exclude(sizes=None)
-        if not "ALL" in sizes:  # incase of an ALL option
-            sized_products = products_original.filter(sizes__value__in=sizes)
-        products = sized_products
+# In-process copies of the small reference tables, looked up without queries
+size_registry = ReferenceRegistry(Size, keys=("value",))
+color_registry = ReferenceRegistry(Color, keys=("value",))
+country_registry = ReferenceRegistry(Country, keys=("name",))
+category_registry = ReferenceRegistry(Category, keys=("slug", "name"))
+REFERENCE_REGISTRIES = (
+    size_registry,
+    color_registry,
+    country_registry,
+    category_registry,
+)
+
+
+def wishlist_cache(owner_id):
+    """
+    The (value-less) versioned namespace of a user's or guest's wishlist, bumped on its changes.
+    """
+    return VersionedCache(f"wishlist:{owner_id}", version_timeout=60 * 60 * 24)
+
+
+async def catalog_etag(request, user=None, guest=None):
+    """
+    Build the ETag of a catalog response from the listing cache version, the wishlist
+    version of the user or guest, and the full path. Only the cache is read.
+    """
+    parts = [await product_listing_cache.aversion(), request.get_full_path()]
+    owner = user or guest
+    if owner:
+        # Guests are never loaded (see `GuestUser.from_signed_id`), so even a saved one
+        # looks unsaved: the version is always read
+        parts += [str(owner.id), await wishlist_cache(owner.id).aversion()]
+    return make_etag(*parts)
+
 
+def color_size_filter_products(products, sizes, colors):
+    """
+    Filter products having any of the given sizes or colors ("ALL" matches any size/color).
+    Uses the denormalized size_values/color_values arrays (GIN indexed), so no joins
+    or DISTINCT are needed.
+    """
+    size_filter = color_filter = None
+    if len(sizes) > 0:
+        # incase of an ALL option
+        size_filter = (
+            ~Q(size_values=[]) if "ALL" in sizes else Q(size_values__overlap=sizes)
+        )
     if len(colors) > 0:
-        colored_products = products_original.exclude(colors=None)
-        if not "ALL" in colors:
-            colored_products = products_original.filter(colors__value__in=colors)
-        products = colored_products
+        color_filter = (
+            ~Q(color_values=[]) if "ALL" in colors else Q(color_values__overlap=colors)
+        )
 
-    if sized_products and colored_products:
-        products = sized_products | colored_products
-    return products.distinct()
+    if size_filter and color_filter:
+        return products.filter(size_filter | color_filter)
+    if size_filter or color_filter:
+        return products.filter(size_filter or color_filter)
+    return products
 
 
-async def fetch_products(request, user, guest, extra_filter: Dict = None):
-    name_filter = request.GET.get("name")
-    products = (
-        Product.objects.select_related("category", "seller", "seller__user")
-        .prefetch_related("sizes", "colors")
-        .annotate(**REVIEWS_AND_RATING_WISHLISTED_CARTED_ANNOTATION(user, guest))
-        .filter(in_stock__gt=0)
+async def product_facets(products):
+    """
+    Count the given (filtered) products per size, color and category slug,
+    plus their total, in a single query.
+
+    Returns:
+        dict: {"sizes": {value: count}, "colors": {value: count}, "categories": {slug: count}, "total": count}
+    """
+    matched_sql, params = (
+        products.order_by()
+        .values("id", "category_id", "size_values", "color_values")
+        .query.sql_with_params()
     )
-    if name_filter:
+    sql = f"""
+        WITH matched AS ({matched_sql})
+        SELECT 'sizes', value, COUNT(*) FROM matched, unnest(matched.size_values) AS value GROUP BY value
+        UNION ALL
+        SELECT 'colors', value, COUNT(*) FROM matched, unnest(matched.color_values) AS value GROUP BY value
+        UNION ALL
+        SELECT 'categories', category.slug, COUNT(*) FROM matched
+            JOIN {Category._meta.db_table} AS category ON category.id = matched.category_id
+            GROUP BY category.slug
+        UNION ALL
+        SELECT 'total', NULL, COUNT(*) FROM matched
+    """
+
+    def run_query():
+        with connections[products.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    facets = {"sizes": {}, "colors": {}, "categories": {}, "total": 0}
+    for facet, value, count in await aread(run_query):
+        if facet == "total":
+            facets["total"] = count
+        else:
+            facets[facet][value] = count
+    return facets
+
+
+class JSONBuildObject(Func):
+    """
+    Postgres' json_build_object, from keyword arguments (field names or expressions).
+
+    Unlike Django's JSONObject (a jsonb object), it keeps the keys in their given order.
+    """
+
+    function = "JSON_BUILD_OBJECT"
+    output_field = JSONField()
+
+    def __init__(self, **fields):
+        expressions = []
+        for key, value in fields.items():
+            expressions.append(Cast(Value(key), TextField()))
+            expressions.append(F(value) if isinstance(value, str) else value)
+        super().__init__(*expressions)
+
+
+# A product card as `ProductSerializer` outputs it, built by the database. Fetched
+# as text and decoded by `load_product_card` (with orjson, not the stdlib json)
+PRODUCT_CARD = Cast(
+    JSONBuildObject(
+        seller=Case(
+            When(
+                seller__isnull=False,
+                then=JSONBuildObject(
+                    name="seller__business_name",
+                    slug="seller__slug",
+                    avatar="seller__user__avatar_url",
+                ),
+            )
+        ),
+        name="name",
+        slug="slug",
+        desc="desc",
+        # numeric(10, 2) as text keeps its 2 decimals, like the DecimalFields
+        price_old=Cast("price_old", CharField()),
+        price_current=Cast("price_current", CharField()),
+        category=JSONBuildObject(
+            name="category__name", slug="category__slug", image="category__image_url"
+        ),
+        sizes="size_values",
+        colors="color_values",
+        reviews_count="reviews_count",
+        avg_rating="avg_rating",
+        wishlisted=Value(False),
+        image1="image1_url",
+        image2="image2_url",
+        image3="image3_url",
+    ),
+    TextField(),
+)
+
+
+def load_product_card(card):
+    card = orjson.loads(card)
+    # Whole floats are encoded as integers by Postgres (4, not 4.0)
+    card["avg_rating"] = float(card["avg_rating"])
+    return card
+
+
+async def filter_products(request, extra_filter: Dict = None):
+    """
+    Build the in-stock products queryset of a listing request, and its ordering.
+
+    With a `search` param, products are full-text matched and ordered by rank.
+    With `fuzzy=true`, the `name` param is matched against product and seller names
+    by trigram similarity (typo tolerant) and ordered by similarity.
+    """
+    name_filter = request.GET.get("name")
+    search = request.GET.get("search")
+    ordering = ("-created_at", "-id")
+    products = Product.objects.filter(in_stock__gt=0)
+    if name_filter and request.GET.get("fuzzy") == "true":
+        products = await fuzzy_filter_products(products, name_filter)
+        ordering = ("-similarity", "-id")
+    elif name_filter:
         products = products.filter(name__icontains=name_filter)
+    if search:
+        query = SearchQuery(search, search_type="websearch", config=SEARCH_CONFIG)
+        products = products.filter(search_vector=query).annotate(
+            rank=SearchRank(F("search_vector"), query)
+        )
+        ordering = ("-rank", "-id")
     if extra_filter:
         products = products.filter(**extra_filter)
-    products = await sync_to_async(list)(
-        color_size_filter_products(
-            products.order_by("-created_at"),
-            request.GET.getlist("size"),
-            request.GET.getlist("color"),
+    products = color_size_filter_products(
+        products.order_by(*ordering),
+        request.GET.getlist("size"),
+        request.GET.getlist("color"),
+    )
+    return products, ordering
+
+
+async def paginate_products(request, paginator, products, page_queryset, ordering):
+    """
+    Paginate `page_queryset` (the display version of the filtered `products`).
+
+    The total is counted on the plain filtered queryset, so the joins and annotations
+    only needed for display are computed for the rows of the requested page alone.
+    With `facets=true`, per size, color and category counts of all matching products
+    are returned too (see `product_facets`).
+    """
+    if request.GET.get("facets") != "true":
+        return await paginator.apaginate_queryset(
+            page_queryset, request, count_queryset=products, ordering=ordering
         )
+    # The facets query also counts the products, so the paginator needn't
+    facets = await product_facets(products)
+    paginated_data = await paginator.apaginate_queryset(
+        page_queryset, request, count=facets.pop("total"), ordering=ordering
     )
-    return products
+    paginated_data["facets"] = facets
+    return paginated_data
+
+
+async def fetch_products(request, paginator, extra_filter: Dict = None):
+    """
+    Fetch a page of in-stock products (model instances) for the listing endpoints.
+
+    Filtering, ordering and slicing all happen in the database, see `filter_products`
+    and `paginate_products`.
+    """
+    products, ordering = await filter_products(request, extra_filter)
+    # The page is the same for everyone, see `apply_wishlist_overlay` for the personal part
+    annotated_products = products.select_related("category", "seller", "seller__user")
+    return await paginate_products(
+        request, paginator, products, annotated_products, ordering
+    )
+
+
+async def fetch_product_cards(request, paginator, extra_filter: Dict = None):
+    """
+    Fetch a page of in-stock products for the listing endpoints, like `fetch_products`,
+    already shaped like `ProductsResponseDataSerializer`.
+
+    Each product card is built as JSON by the database (see `PRODUCT_CARD`) and only
+    decoded here, so no model instance is created for the products, their category
+    or seller.
+    """
+    products, ordering = await filter_products(request, extra_filter)
+    # The ordering fields are fetched along for the cursor of the next page
+    cards = products.values(
+        *(field.lstrip("-") for field in ordering), card=PRODUCT_CARD
+    )
+    paginated_data = await paginate_products(
+        request, paginator, products, cards, ordering
+    )
+    data = compile_serializer(PaginatedResponseDataSerializer)(paginated_data)
+    data["products"] = [
+        load_product_card(row["card"]) for row in paginated_data["items"]
+    ]
+    if "facets" in paginated_data:
+        data["facets"] = paginated_data["facets"]
+    return data
+
+
+def listing_cache_params(request):
+    """
+    The listing query params a cached page depends on, normalized so equivalent
+    requests share an entry (unknown params are ignored, sizes/colors are sorted).
+    """
+    params = {}
+    for param in LISTING_CACHE_PARAMS:
+        values = request.GET.getlist(param)
+        if values:
+            params[param] = sorted(values) if param in ("size", "color") else values
+    return params
+
+
+async def apply_wishlist_overlay(products_data, user, guest):
+    """
+    Set the `wishlisted` flag of serialized products for a user or guest (as returned by
+    `get_user_or_guest`), with one query over the products of the page only.
+
+    Products are matched by slug (unique and indexed), since shared cached pages
+    don't carry product ids.
+    """
+    slugs = [product["slug"] for product in products_data]
+    wishlisted = set()
+    if slugs and (user or guest):
+        wishlisted = set(
+            await alist(
+                Wishlist.objects.filter(
+                    user=user, guest=guest, product__slug__in=slugs
+                ).values_list("product__slug", flat=True)
+            )
+        )
+    for product in products_data:
+        product["wishlisted"] = product["slug"] in wishlisted
+    return products_data
+
+
+async def fuzzy_filter_products(products, name):
+    """
+    Filter products whose name, or seller's business name, is similar to `name`
+    and annotate the best word similarity as `similarity`.
+
+    Both conditions are index-assisted through the trigram GIN indexes. The matching
+    seller ids are fetched first so the OR stays on the product table.
+    """
+    threshold = settings.PRODUCT_FUZZY_SEARCH_THRESHOLD
+    seller_ids = await alist(
+        Seller.objects.filter(business_name__trigram_word_similar=name).values_list(
+            "id", flat=True
+        )
+    )
+    return (
+        products.alias(upper_name=Upper("name"))
+        .filter(Q(upper_name__trigram_word_similar=name) | Q(seller_id__in=seller_ids))
+        .annotate(
+            similarity=Greatest(
+                TrigramWordSimilarity(name, Upper("name")),
+                TrigramWordSimilarity(name, "seller__business_name"),
+            )
+        )
+        .filter(similarity__gte=threshold)
+    )
+
+
+def product_search_vector():
+    """
+    The weighted tsvector stored in `Product.search_vector`:
+    name (A), category name (B) and description (C).
+    """
+    category_name = Category.objects.filter(id=OuterRef("category_id")).values("name")
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(Subquery(category_name), weight="B", config=SEARCH_CONFIG)
+        + SearchVector("desc", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def update_product_search_vectors(products):
+    """
+    Recompute the search_vector of the given products in a single UPDATE.
+    Returns the number of products updated.
+    """
+    return products.update(search_vector=product_search_vector())
+
+
+def rebuild_product_ratings(products):
+    """
+    Recompute the denormalized reviews_count and avg_rating of the given products
+    from their reviews, in a single UPDATE. Returns the number of products updated.
+    """
+    reviews = Review.objects.filter(product=OuterRef("pk")).order_by().values("product")
+    return products.update(
+        reviews_count=Coalesce(
+            Subquery(reviews.annotate(count=Count("id")).values("count")), Value(0)
+        ),
+        avg_rating=Coalesce(
+            Subquery(reviews.annotate(avg=Avg("rating")).values("avg")),
+            Value(0),
+            output_field=FloatField(),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def update_product_size_color_values(products):
+    """
+    Recompute the denormalized size_values and color_values of the given products
+    from their sizes and colors, in a single UPDATE. Returns the number of products updated.
+    """
+    sizes = Product.sizes.through.objects.filter(product_id=OuterRef("pk"))
+    colors = Product.colors.through.objects.filter(product_id=OuterRef("pk"))
+    return products.update(
+        size_values=ArraySubquery(sizes.order_by("id").values("size__value")),
+        color_values=ArraySubquery(colors.order_by("id").values("color__value")),
+        updated_at=timezone.now(),
+    )
+
+
+# Keyset orderings of the reviews of a product. The rating ones are read straight
+# from the review_product_rating_idx (product, rating, created_at, id) index, the date
+# ones from the review_product_created_idx (product, created_at, id) one
+REVIEW_SORT_ORDERINGS = {
+    "highest": ("-rating", "-created_at", "-id"),
+    "lowest": ("rating", "created_at", "id"),
+    "newest": ("-created_at", "-id"),
+    "oldest": ("created_at", "id"),
+}
+
+
+async def fetch_product_reviews(request, product, paginator, sort="highest"):
+    """
+    Fetch a page of the reviews of a product in the database, in one of the `REVIEW_SORT_ORDERINGS`.
+    The stored reviews_count is used as the total, so no COUNT query is run.
+    """
+    ordering = REVIEW_SORT_ORDERINGS[sort]
+    reviews = (
+        Review.objects.filter(product_id=product.id)
+        .select_related("user")
+        .order_by(*ordering)
+    )
+    return await paginator.apaginate_queryset(
+        reviews, request, count=product.reviews_count, ordering=ordering
+    )
+
+
+RELATED_PRODUCTS_LIMIT = 10
+
+
+def update_product_related_ids(products):
+    """
+    Recompute the related_ids of the given products in a single UPDATE.
+    Returns the number of products updated.
+
+    The related products of a product are the other in-stock products of its category,
+    ranked by how many successful orders they share with it, then by rating.
+    """
+    co_purchases = (
+        OrderItem.objects.filter(
+            product=OuterRef("pk"),
+            order__payment_status="SUCCESSFUL",
+            order__orderitems__product=OuterRef(OuterRef("pk")),
+        )
+        .order_by()
+        .values("product")
+        .annotate(count=Count("order", distinct=True))
+        .values("count")
+    )
+    related = (
+        Product.objects.filter(category_id=OuterRef("category_id"), in_stock__gt=0)
+        .exclude(id=OuterRef("id"))
+        .annotate(co_purchases=Coalesce(Subquery(co_purchases), Value(0)))
+        .order_by("-co_purchases", "-avg_rating", "-reviews_count", "-created_at")
+        .values("id")[:RELATED_PRODUCTS_LIMIT]
+    )
+    return products.update(related_ids=ArraySubquery(related))
+
+
+async def fetch_related_products(product):
+    """
+    Fetch the precomputed related products of a product by primary key, in their rank order.
+    Those gone out of stock since the last refresh are left out.
+    """
+    if not product.related_ids:
+        return []
+    products = await alist(
+        Product.objects.select_related("category", "seller", "seller__user").filter(
+            id__in=product.related_ids, in_stock__gt=0
+        )
+    )
+    rank = {id: index for index, id in enumerate(product.related_ids)}
+    return sorted(products, key=lambda related: rank[related.id])
 
 
 def append_shipping_details(data: Dict, shipping: ShippingAddress):
@@ -130,3 +588,6 @@ def update_product_in_stock(orderitems):
             product.in_stock = new_stock
             products_to_update.append(product)
     Product.objects.bulk_update(products_to_update, ["in_stock"])
+    if products_to_update:
+        # bulk_update skips the signals that invalidate the cached listings
+        product_listing_cache.invalidate()
@@ -6,12 +6,15 @@ from adrf.views import APIView
 from drf_spectacular.utils import extend_schema
 from apps.accounts.senders import EmailUtil
 from apps.common.decorators import aatomic
+from apps.common.executors import aread
+from apps.common.pg import async_reads_enabled
 from apps.common.exceptions import (
     ErrorCode,
     NotFoundError,
     RequestError,
     ValidationErr,
 )
+from apps.common.cache import not_modified_response, set_etag
 from apps.common.paginators import CustomPagination
 from apps.common.permissions import (
     IsAuthenticatedCustom,
@@ -19,13 +22,11 @@ from apps.common.permissions import (
 )
 from apps.common.responses import CustomResponse
 from apps.common.schema_examples import page_parameter_example
+from apps.common.serializers import compile_serializer
 from apps.common.utils import (
-    REVIEWS_AND_RATING_WISHLISTED_CARTED_ANNOTATION,
     get_user_or_guest,
 )
 from apps.shop.models import (
-    Category,
-    Country,
     Coupon,
     Order,
     OrderItem,
@@ -40,12 +41,15 @@ from apps.shop.schema_examples import (
     CHECKOUT_RESPONSE_EXAMPLE,
     ORDERITEM_RESPONSE_EXAMPLE,
     PRODUCT_RESPONSE,
+    PRODUCT_REVIEWS_PARAM_EXAMPLE,
+    PRODUCT_REVIEWS_RESPONSE,
     PRODUCTS_BY_CATEGORY_RESPONSE_EXAMPLE,
     PRODUCTS_PARAM_EXAMPLE,
     PRODUCTS_RESPONSE,
     REVIEW_RESPONSE_EXAMPLE,
     WISHLIST_RESPONSE_EXAMPLE,
 )
+from apps.shop.queries import afetch_product_detail, afetch_product_page
 from apps.shop.serializers import (
     CategorySerializer,
     CheckoutSerializer,
@@ -54,17 +58,29 @@ from apps.shop.serializers import (
     OrderSerializer,
     ProductDetailSerializer,
     ProductsResponseDataSerializer,
+    ReviewResponseDataSerializer,
     ReviewSerializer,
     ToggleCartItemSerializer,
 )
 from apps.shop.utils import (
     append_shipping_details,
-    fetch_products,
+    apply_wishlist_overlay,
+    catalog_etag,
+    category_registry,
+    color_registry,
+    country_registry,
+    fetch_product_cards,
+    fetch_product_reviews,
+    fetch_related_products,
+    listing_cache_params,
+    REVIEW_SORT_ORDERINGS,
+    product_listing_cache,
+    size_registry,
     update_product_in_stock,
+    update_product_related_ids,
     verify_webhook_signature,
 )
-from asgiref.sync import sync_to_async
-import hashlib, hmac, json, decimal
+import asyncio, hashlib, hmac, json, decimal
 
 tags = ["Shop"]
 
@@ -97,11 +113,24 @@ class CategoriesView(APIView):
         Returns:
             CustomResponse: A response containing serialized category data.
         """
-        categories = await sync_to_async(list)(Category.objects.all())
-        serializer = self.serializer_class(categories, many=True)
-        return CustomResponse.success(
-            message="Categories fetched successfully", data=serializer.data
+        etag = await catalog_etag(request)
+        not_modified = not_modified_response(request, etag)
+        if not_modified:
+            return not_modified
+
+        cache_key = await product_listing_cache.amake_key("categories")
+        data = await product_listing_cache.aget(cache_key)
+        cache_status = "HIT"
+        if data is None:
+            cache_status = "MISS"
+            categories = await category_registry.aall()
+            data = self.serializer_class(categories, many=True).data
+            await product_listing_cache.aset(cache_key, data)
+        response = CustomResponse.success(
+            message="Categories fetched successfully", data=data
         )
+        response["X-Cache"] = cache_status
+        return set_etag(response, etag)
 
 
 class ProductsView(APIView):
@@ -137,13 +166,30 @@ class ProductsView(APIView):
             CustomResponse: A response containing serialized and paginated product data.
         """
         user, guest = get_user_or_guest(request.user)
-        products = await fetch_products(request, user, guest)
-
-        paginated_data = self.paginator_class.paginate_queryset(products, request)
-        serializer = self.serializer_class(paginated_data)
-        return CustomResponse.success(
-            message="Products Fetched Successfully", data=serializer.data
+        etag = await catalog_etag(request, user, guest)
+        not_modified = not_modified_response(request, etag)
+        if not_modified:
+            return not_modified
+
+        # The page is cached without the personal wishlisted flags, set afterwards
+        cache_key = await product_listing_cache.amake_key(
+            "products", params=listing_cache_params(request)
         )
+        data = await product_listing_cache.aget(cache_key)
+        cache_status = "HIT"
+        if data is None:
+            cache_status = "MISS"
+            # Plain pages are read without the ORM with DB_ASYNC_READS on
+            data = await afetch_product_page(request, self.paginator_class)
+            if data is None:
+                data = await fetch_product_cards(request, self.paginator_class)
+            await product_listing_cache.aset(cache_key, data)
+        await apply_wishlist_overlay(data["products"], user, guest)
+        response = CustomResponse.success(
+            message="Products Fetched Successfully", data=data
+        )
+        response["X-Cache"] = cache_status
+        return set_etag(response, etag)
 
 
 class ProductView(APIView):
@@ -182,33 +228,54 @@ class ProductView(APIView):
             CustomResponse: A response containing serialized product details.
         """
         user, guest = get_user_or_guest(request.user)
-        product = await (
-            Product.objects.select_related("category", "seller", "seller__user")
-            .prefetch_related("sizes", "colors", "reviews", "reviews__user")
-            .annotate(**REVIEWS_AND_RATING_WISHLISTED_CARTED_ANNOTATION(user, guest))
-            .aget_or_none(in_stock__gt=0, slug=kwargs["slug"])
-        )
-        if not product:
-            raise NotFoundError("Product does not exist!")
+        etag = await catalog_etag(request, user, guest)
+        not_modified = not_modified_response(request, etag)
+        if not_modified:
+            return not_modified
 
-        product_reviews = await sync_to_async(list)(
-            product.reviews.select_related("user").order_by("-rating")
-        )
-        paginated_data = self.paginator_class.paginate_queryset(
-            product_reviews, request
+        if async_reads_enabled():
+            data = await self.afetch_product_data(request, kwargs["slug"])
+        else:
+            product = await aread(
+                Product.objects.select_related(
+                    "category", "seller", "seller__user"
+                ).get_or_none,
+                in_stock__gt=0,
+                slug=kwargs["slug"],
+            )
+            if not product:
+                raise NotFoundError("Product does not exist!")
+
+            # Both are read in parallel in the read executor
+            paginated_data, product.related_products = await asyncio.gather(
+                fetch_product_reviews(request, product, self.paginator_class),
+                fetch_related_products(product),
+            )
+            product.reviews_data = paginated_data
+            data = compile_serializer(self.serializer_class)(product)
+        await apply_wishlist_overlay([data, *data["related_products"]], user, guest)
+        response = CustomResponse.success(
+            message="Product Details Fetched Successfully", data=data
         )
-        product.related_products = await sync_to_async(list)(
-            Product.objects.select_related("category", "seller")
-            .prefetch_related("sizes", "colors")
-            .annotate(**REVIEWS_AND_RATING_WISHLISTED_CARTED_ANNOTATION(user, guest))
-            .filter(category_id=product.category_id, in_stock__gt=0)
-            .exclude(id=product.id)[:10]
+        return set_etag(response, etag)
+
+    async def afetch_product_data(self, request, slug):
+        """
+        Read the product and its related products without the ORM (see `afetch_product_detail`),
+        then its reviews, shaped like `ProductDetailSerializer`.
+        """
+        detail = await afetch_product_detail(slug)
+        if not detail:
+            raise NotFoundError("Product does not exist!")
+        row, data = detail
+        product = Product(id=row["id"], reviews_count=row["reviews_count"])
+        paginated_data = await fetch_product_reviews(
+            request, product, self.paginator_class
         )
-        product.reviews_data = paginated_data
-        serializer = self.serializer_class(product)
-        return CustomResponse.success(
-            message="Product Details Fetched Successfully", data=serializer.data
+        data["reviews"] = compile_serializer(ReviewResponseDataSerializer)(
+            paginated_data
         )
+        return data
 
     @extend_schema(
         summary="Write a review",
@@ -267,6 +334,49 @@ class ProductView(APIView):
         return [IsAuthenticatedOrGuestCustom()]
 
 
+class ProductReviewsView(APIView):
+    """
+    API view to fetch the reviews of a product.
+
+    Methods:
+        get: Asynchronously fetches and returns a page of the reviews of a product, in the requested order.
+    """
+
+    permission_classes = [IsAuthenticatedOrGuestCustom]
+    serializer_class = ReviewResponseDataSerializer
+    paginator_class = CustomPagination()
+
+    @extend_schema(
+        summary="Product Reviews Fetch",
+        description="""
+            This endpoint returns the reviews of a product via the slug.
+            Reviews can be sorted by rating (highest or lowest first) or date (newest or oldest first).
+        """,
+        tags=tags,
+        parameters=PRODUCT_REVIEWS_PARAM_EXAMPLE,
+        responses=PRODUCT_REVIEWS_RESPONSE,
+    )
+    async def get(self, request, *args, **kwargs):
+        sort = request.GET.get("sort", "highest")
+        if sort not in REVIEW_SORT_ORDERINGS:
+            raise ValidationErr(
+                "sort", f"Must be one of: {', '.join(REVIEW_SORT_ORDERINGS)}"
+            )
+        # Like the product's details, only in stock products are found
+        product = await Product.objects.aget_or_none(
+            in_stock__gt=0, slug=kwargs["slug"]
+        )
+        if not product:
+            raise NotFoundError("Product does not exist!")
+        paginated_data = await fetch_product_reviews(
+            request, product, self.paginator_class, sort
+        )
+        serializer = self.serializer_class(paginated_data)
+        return CustomResponse.success(
+            message="Product Reviews Fetched Successfully", data=serializer.data
+        )
+
+
 class WishlistView(APIView):
     """
     API view to fetch all products in a wishlist.
@@ -291,13 +401,16 @@ class WishlistView(APIView):
     )
     async def get(self, request):
         user, guest = get_user_or_guest(request.user)
-        products = await fetch_products(
-            request, user, guest, {"wishlist__user": user, "wishlist__guest": guest}
+        data = await fetch_product_cards(
+            request,
+            self.paginator_class,
+            {"wishlist__user": user, "wishlist__guest": guest},
         )
-        paginated_data = self.paginator_class.paginate_queryset(products, request)
-        serializer = self.serializer_class(paginated_data)
+        # Everything listed here is wishlisted, no need to look it up
+        for product in data["products"]:
+            product["wishlisted"] = True
         return CustomResponse.success(
-            message="Wishlist Products Fetched Successfully", data=serializer.data
+            message="Wishlist Products Fetched Successfully", data=data
         )
 
 
@@ -325,6 +438,8 @@ class ToggleWishlistView(APIView):
         product = await Product.objects.aget_or_none(slug=kwargs["slug"])
         if not product:
             raise NotFoundError("Product does not exist!")
+        if guest:
+            await guest.amaterialize()
         wishlist, created = await Wishlist.objects.aget_or_create(
             user=user, guest=guest, product=product
         )
@@ -363,16 +478,38 @@ class ProductsByCategoryView(APIView):
     )
     async def get(self, request, *args, **kwargs):
         user, guest = get_user_or_guest(request.user)
-        category = await Category.objects.aget_or_none(slug=kwargs["slug"])
-        if not category:
-            raise NotFoundError("Category does not exist!")
-
-        products = await fetch_products(request, user, guest, {"category": category})
-        paginated_data = self.paginator_class.paginate_queryset(products, request)
-        serializer = self.serializer_class(paginated_data)
-        return CustomResponse.success(
-            message="Products Fetched Successfully", data=serializer.data
+        etag = await catalog_etag(request, user, guest)
+        not_modified = not_modified_response(request, etag)
+        if not_modified:
+            return not_modified
+
+        # The page is cached without the personal wishlisted flags, set afterwards
+        cache_key = await product_listing_cache.amake_key(
+            "category", kwargs["slug"], params=listing_cache_params(request)
+        )
+        data = await product_listing_cache.aget(cache_key)
+        cache_status = "HIT"
+        if data is None:
+            cache_status = "MISS"
+            category = await category_registry.aget("slug", kwargs["slug"])
+            if not category:
+                raise NotFoundError("Category does not exist!")
+
+            # Plain pages are read without the ORM with DB_ASYNC_READS on
+            data = await afetch_product_page(
+                request, self.paginator_class, category_id=category.id
+            )
+            if data is None:
+                data = await fetch_product_cards(
+                    request, self.paginator_class, {"category": category}
+                )
+            await product_listing_cache.aset(cache_key, data)
+        await apply_wishlist_overlay(data["products"], user, guest)
+        response = CustomResponse.success(
+            message="Products Fetched Successfully", data=data
         )
+        response["X-Cache"] = cache_status
+        return set_etag(response, etag)
 
 
 class CartView(APIView):
@@ -400,16 +537,18 @@ class CartView(APIView):
     )
     async def get(self, request, *args, **kwargs):
         user, guest = get_user_or_guest(request.user)
-        orderitems = await sync_to_async(list)(
-            OrderItem.objects.filter(user=user, guest=guest, order=None).select_related(
+        orderitems = (
+            OrderItem.objects.filter(user=user, guest=guest, order=None)
+            .select_related(
                 "product", "product__seller", "product__seller__user", "size", "color"
             )
+            .order_by("-created_at", "-id")
         )
-        paginated_data = self.paginator_class.paginate_queryset(orderitems, request)
-        serializer = self.serializer_class(paginated_data)
-        return CustomResponse.success(
-            message="Cart Items Returned", data=serializer.data
+        paginated_data = await self.paginator_class.apaginate_queryset(
+            orderitems, request
         )
+        data = compile_serializer(self.serializer_class)(paginated_data)
+        return CustomResponse.success(message="Cart Items Returned", data=data)
 
     @extend_schema(
         summary="Toggle Item in cart",
@@ -436,19 +575,27 @@ class CartView(APIView):
         ).aget_or_none(slug=data["slug"])
         if not product:
             raise ValidationErr("slug", "No Product with that slug")
-        if not size and (await product.sizes.aexists()):
+        # The product's sizes and colors are checked against its denormalized values
+        if not size and product.size_values:
             raise ValidationErr("size", "Enter a size")
-        if not color and (await product.colors.aexists()):
+        if not color and product.color_values:
             raise ValidationErr("color", "Enter a color")
         if size:
-            size = await product.sizes.aget_or_none(value=size)
+            if size not in product.size_values:
+                raise ValidationErr("size", "Invalid size selected")
+            # The product's size may be newer than this worker's registry
+            size = await size_registry.aget("value", size, reload=True)
             if not size:
                 raise ValidationErr("size", "Invalid size selected")
 
         if color:
-            color = await product.colors.aget_or_none(value=color)
+            if color not in product.color_values:
+                raise ValidationErr("color", "Invalid color selected")
+            color = await color_registry.aget("value", color, reload=True)
             if not color:
                 raise ValidationErr("color", "Invalid color selected")
+        if guest:
+            await guest.amaterialize()
         orderitem, created = await OrderItem.objects.aupdate_or_create(
             user=user,
             guest=guest,
@@ -540,7 +687,7 @@ class CheckoutView(APIView):
         shipping_id = data.get("shipping_id")
         shipping = data.get("shipping")
         if shipping:
-            country = await Country.objects.aget_or_none(name=shipping["country"])
+            country = await country_registry.aget("name", shipping["country"])
             if not country:
                 raise ValidationErr("shipping", {"country": "Country does not exist"})
             shipping["country"] = country
@@ -649,6 +796,10 @@ def paystack_webhook(request):
             order.payment_status = "SUCCESSFUL"
             order.save()
             update_product_in_stock(order.orderitems.all())
+            # The order adds to the co-purchases of its products
+            update_product_related_ids(
+                Product.objects.filter(id__in=order.orderitems.values("product_id"))
+            )
             # Send email
             EmailUtil.send_payment_success_email(
                 user.full_name, user.email, amount_payable
@@ -723,6 +874,10 @@ def paypal_webhook(request):
                 order.save()
 
                 update_product_in_stock(order.orderitems.all())
+                # The order adds to the co-purchases of its products
+                update_product_related_ids(
+                    Product.objects.filter(id__in=order.orderitems.values("product_id"))
+                )
                 # Send email
                 EmailUtil.send_payment_success_email(
                     user.full_name, user.email, amount_payable
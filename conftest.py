@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def test_settings(settings):
+    # The executor threads' connections can't see the data of the tests' transactions
+    settings.DB_READ_EXECUTOR_THREADS = 0
+    # Same for the transaction threads, the tests' transactions are run on their thread
+    settings.DB_TRANSACTION_THREADS = 0
@@ -14,3 +14,21 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ecommerce_store.settings")
 
 application = get_asgi_application()
+
+# Loaded ahead of the first requests, which then look them up without queries
+from apps.common.registry import warm_registries
+from apps.shop.utils import REFERENCE_REGISTRIES
+
+from django.db import connections
+
+warm_registries(*REFERENCE_REGISTRIES)
+# The connection used to load them is given back (to the pool) rather than kept
+# by the importing thread
+connections.close_all()
+
+from django.conf import settings
+
+if settings.DB_POOL_METRICS_INTERVAL:
+    from apps.common.db.base import log_pool_metrics
+
+    log_pool_metrics(settings.DB_POOL_METRICS_INTERVAL)
@@ -1,5 +1,6 @@
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -23,7 +24,8 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.AllowAny",),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_RENDERER_CLASSES": (
-        "apps.common.renderers.GuestIDRenderer",
+        # orjson based, "apps.common.renderers.GuestIDRenderer" is the stdlib json one
+        "apps.common.renderers.ORJSONGuestIDRenderer",
         "rest_framework.renderers.JSONRenderer",
     ),
     "TEST_REQUEST_DEFAULT_FORMAT": "json",
@@ -46,6 +48,7 @@ DJANGO_APPS = [
     "whitenoise.runserver_nostatic",
     "django.contrib.staticfiles",
     "django.contrib.sites",
+    "django.contrib.postgres",
 ]
 
 SITE_ID = 1
@@ -102,7 +105,7 @@ SPECTACULAR_SETTINGS = {
                 "type": "apiKey",
                 "in": "header",
                 "name": "Guest-User-ID",
-                "description": "For guest wishlists and cart. The ID can come form any endpoint that requires the guest ID",
+                "description": "For guest wishlists and cart. The (signed) ID can come form any endpoint that requires the guest ID",
             },
         }
     },
@@ -158,18 +161,101 @@ ASGI_APPLICATION = "ecommerce_store.asgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Minimum pg_trgm word similarity (0 to 1) for products matched by ?fuzzy=true searches
+PRODUCT_FUZZY_SEARCH_THRESHOLD = config(
+    "PRODUCT_FUZZY_SEARCH_THRESHOLD", default=0.4, cast=float
+)
+
+# Take the connections from a per process pool (see apps.common.db.base), instead of
+# connecting on every request. The read executor threads hold one each, so the max
+# size must leave room for the requests' ones
+DB_POOL = config("DB_POOL", default=True, cast=bool)
+DB_POOL_OPTIONS = {
+    "min_size": config("DB_POOL_MIN_SIZE", default=2, cast=int),
+    "max_size": config("DB_POOL_MAX_SIZE", default=20, cast=int),
+    # Seconds a request waits for a connection before failing
+    "timeout": config("DB_POOL_TIMEOUT", default=10, cast=float),
+    # Seconds after which idle connections (above min_size) are closed, and
+    # connections are replaced
+    "max_idle": config("DB_POOL_MAX_IDLE", default=300, cast=float),
+    "max_lifetime": config("DB_POOL_MAX_LIFETIME", default=1800, cast=float),
+}
+# Seconds between the logs of the pools' metrics (in use, waiting, wait time), 0 to disable
+DB_POOL_METRICS_INTERVAL = config("DB_POOL_METRICS_INTERVAL", default=0, cast=int)
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "apps.common.db",
         "NAME": config("POSTGRES_DB"),
         "USER": config("POSTGRES_USER"),
         "PASSWORD": config("POSTGRES_PASSWORD"),
         "HOST": config("POSTGRES_SERVER"),
         "PORT": config("POSTGRES_PORT"),
+        # Pooled connections go back to the pool when closed, and are checked when taken
+        "CONN_MAX_AGE": 0,
+        "CONN_HEALTH_CHECKS": config("DB_POOL_HEALTH_CHECKS", default=True, cast=bool),
+        "OPTIONS": {
+            # Let the pg_trgm index pre-filter fuzzy product searches at our threshold
+            "options": f"-c pg_trgm.word_similarity_threshold={PRODUCT_FUZZY_SEARCH_THRESHOLD}",
+            "pool": DB_POOL_OPTIONS if DB_POOL else False,
+        },
     }
 }
 
 
+# The caches (listings, ETag versions, reference registries, tokens) are invalidated
+# by bumping versions in this cache, so with several worker processes it must be an
+# in-memory cache they share: Redis, with CACHE_LOCATION=redis://host:6379/0. Without
+# a location, it's the local memory cache of the process (fine for a single process).
+CACHE_LOCATION = config("CACHE_LOCATION", default="")
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND",
+            default=(
+                "django.core.cache.backends.redis.RedisCache"
+                if CACHE_LOCATION
+                else "django.core.cache.backends.locmem.LocMemCache"
+            ),
+        ),
+        "LOCATION": CACHE_LOCATION,
+    }
+}
+
+# Seconds a process reuses a cache version before reading it again, so how long the other
+# processes' invalidations may take to be seen
+CACHE_VERSION_CHECK_INTERVAL = config(
+    "CACHE_VERSION_CHECK_INTERVAL", default=2, cast=int
+)
+
+# Worker processes of the server (read by gunicorn too, see entrypoint.sh)
+WEB_CONCURRENCY = config("WEB_CONCURRENCY", default=1, cast=int)
+# Per process caches would never see the other workers' invalidations, and the database
+# cache would turn every version check into a query
+if WEB_CONCURRENCY > 1 and CACHES["default"]["BACKEND"].endswith(
+    (".LocMemCache", ".DummyCache", ".DatabaseCache")
+):
+    raise ImproperlyConfigured(
+        f"CACHE_BACKEND {CACHES['default']['BACKEND']} can't be used by "
+        f"{WEB_CONCURRENCY} worker processes, set CACHE_LOCATION to a Redis server."
+    )
+
+# Threads (each with its own connection) running the read-only queries of a process,
+# 0 runs them on the request's thread like the other queries
+DB_READ_EXECUTOR_THREADS = config("DB_READ_EXECUTOR_THREADS", default=8, cast=int)
+
+# Threads (each with its own connection) async transactions are pinned to, so at most
+# that many run at once per process. 0 runs them on the request's thread
+DB_TRANSACTION_THREADS = config("DB_TRANSACTION_THREADS", default=8, cast=int)
+
+# Serve the hot catalog reads with psycopg's async API and a pool of that many connections
+# (per process) instead of the ORM
+DB_ASYNC_READS = config("DB_ASYNC_READS", default=False, cast=bool)
+DB_ASYNC_POOL_SIZE = config("DB_ASYNC_POOL_SIZE", default=10, cast=int)
+
+# Seconds a cached product listing page lives at most (it's invalidated on changes anyway)
+LISTING_CACHE_TIMEOUT = config("LISTING_CACHE_TIMEOUT", default=300, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -367,5 +453,8 @@ FRONTEND_URL = config("FRONTEND_URL")
 
 ACCESS_TOKEN_EXPIRE_MINUTES = config("ACCESS_TOKEN_EXPIRE_MINUTES")
 REFRESH_TOKEN_EXPIRE_MINUTES = config("REFRESH_TOKEN_EXPIRE_MINUTES")
+# Seconds a worker reuses the user of an access token without querying it (only with
+# a shared cache, which carries the invalidations)
+AUTH_CACHE_TTL = config("AUTH_CACHE_TTL", default=60, cast=int)
 
 DEFAULT_AVATAR_URL = config("DEFAULT_AVATAR_URL")
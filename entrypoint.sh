@@ -2,6 +2,17 @@
 #!/bin/sh
 set -e
 
+# The server's worker processes, read by gunicorn and the settings. Several of them
+# need the shared (Redis) cache of CACHE_LOCATION
+if [ -z "${WEB_CONCURRENCY:-}" ]; then
+    if [ -n "${CACHE_LOCATION:-}" ]; then
+        WEB_CONCURRENCY=2
+    else
+        WEB_CONCURRENCY=1
+    fi
+fi
+export WEB_CONCURRENCY
+
 echo "Running migrations..."
 python manage.py migrate --noinput
 
@@ -11,5 +22,5 @@ python manage.py initd
 echo "Collecting static files..."
 python manage.py collectstatic --noinput --clear
 
-gunicorn --bind :8000 --workers 2 --worker-class uvicorn.workers.UvicornWorker ecommerce_store.asgi
+gunicorn --bind :8000 --worker-class uvicorn.workers.UvicornWorker ecommerce_store.asgi
 exec "$@"